@@ -0,0 +1,4 @@
+"""
+Benchmark aplikasi DO tanpa akun Google: data sintetis (synthetic.py), pengganti worksheet
+gspread di memori (fake_worksheet.py) dan runner yang menulis hasil sebagai JSON (run.py).
+"""
@@ -0,0 +1,52 @@
+"""
+Benchmark pembuatan PDF Surat Jalan: tanpa template (dibangun ulang setiap PDF)
+dibanding template yang sudah di-cache.
+
+Jalankan dari root repo:  python -m benchmarks.bench_pdf_template [jumlah_pdf]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import pdf_surat_jalan
+
+SAMPLE_ROW = {
+    "NOMOR DO": "181025-07", "PIC Delivery": "Pak Budi", "Client": "PT Maju Jaya",
+    "Site/Discharge Addr Line 1": "Jl. Slamet Riyadi No. 1", "Site/Discharge Addr Line 2": "Surakarta",
+    "PO Client": "PO-2025-001", "Jenis BBM": "Biosolar Industri B40", "Transportir": "PT. SHA Solo",
+    "Fleet Number": "AD 1234 XY", "Nama Driver": "Joko", "Qty": 8000.0,
+    "Date": date(2025, 10, 18), "Tgl PO": "2025-10-01",
+}
+
+
+def measure(n, cached):
+    """Mengembalikan (ms per PDF, puncak alokasi KiB per PDF)."""
+    pdf_surat_jalan.load_template.cache_clear()
+    pdf_surat_jalan.build_pdf_sha(SAMPLE_ROW)  # pemanasan import/font
+
+    start = time.perf_counter()
+    for _ in range(n):
+        if not cached:
+            pdf_surat_jalan.load_template.cache_clear()
+        pdf_surat_jalan.build_pdf_sha(SAMPLE_ROW)
+    elapsed = (time.perf_counter() - start) / n
+
+    tracemalloc.start()
+    if not cached:
+        pdf_surat_jalan.load_template.cache_clear()
+    pdf_surat_jalan.build_pdf_sha(SAMPLE_ROW)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for label, cached in [("tanpa cache template", False), ("template di-cache", True)]:
+        ms, peak_kib = measure(n, cached)
+        print(f"{label:<22} {ms:8.1f} ms/PDF   puncak alokasi {peak_kib:9.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Cek invarian cube agg_monthly: setelah campuran acak insert / update / delete (termasuk
+pindah bulan, Qty kosong dan DO tanpa tanggal), cube yang dijaga trigger harus sama dengan
+hasil hitung ulang penuh dari tabel DO.
+
+Jalankan dari root repo:  python -m benchmarks.check_aggregates [jumlah_operasi] [seed]
+"""
+import os
+import random
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_rows
+from storage import SQLiteStorage
+
+AGG_COLUMNS = ["Bulan", "Transportir", "Jenis BBM", "Client"]
+
+
+def expected_aggregates(df):
+    """Cube yang diharapkan, dihitung dengan pandas dari isi mentah tabel DO."""
+    keys = pd.DataFrame({
+        "Bulan": df["Date"].fillna("").astype(str).str[:7],
+        "Transportir": df["Transportir"].fillna(""),
+        "Jenis BBM": df["Jenis BBM"].fillna(""),
+        "Client": df["Client"].fillna(""),
+        "Qty": pd.to_numeric(df["Qty"], errors="coerce").fillna(0.0),
+    })
+    return keys.groupby(AGG_COLUMNS, as_index=False).agg(**{"Qty": ("Qty", "sum"), "Jumlah DO": ("Qty", "size")})
+
+
+def sorted_cube(cube):
+    cube = cube[AGG_COLUMNS + ["Qty", "Jumlah DO"]].copy()
+    cube["Jumlah DO"] = cube["Jumlah DO"].astype(int)
+    return cube.sort_values(AGG_COLUMNS).reset_index(drop=True)
+
+
+def random_edit(rng, row, pool):
+    """Mengubah satu atau beberapa kolom kunci cube / Qty dengan nilai dari baris lain."""
+    other = rng.choice(pool)
+    for col in rng.sample(["Date", "Transportir", "Jenis BBM", "Client", "Qty"], rng.randint(1, 3)):
+        row[col] = other[col]
+    if rng.random() < 0.05:
+        row["Qty"] = None
+    if rng.random() < 0.05:
+        row["Date"] = None
+    return row
+
+
+def check(operations=2000, seed=0):
+    """Mengembalikan jumlah baris cube yang berbeda (0 = invarian terpenuhi)."""
+    rng = random.Random(seed)
+    pool = list(generate_rows(500, clients=8, transportirs=3, days=120, seed=seed))
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = SQLiteStorage(os.path.join(workdir, "check.sqlite"))
+        rows = {}
+        for _ in range(operations):
+            action = rng.random()
+            if action < 0.4 or not rows:
+                row = dict(rng.choice(pool))
+                rows[row["NOMOR DO"]] = row
+                storage.upsert(row)
+            elif action < 0.75:
+                key = rng.choice(list(rows))
+                rows[key] = random_edit(rng, dict(rows[key]), pool)
+                storage.upsert(rows[key])
+            elif action < 0.95:
+                key = rng.choice(list(rows))
+                del rows[key]
+                storage.delete(key)
+            else:
+                batch = [random_edit(rng, dict(rng.choice(pool)), pool) for _ in range(rng.randint(1, 20))]
+                rows.update((r["NOMOR DO"], r) for r in batch)
+                storage.upsert_many(batch)
+
+        incremental = sorted_cube(storage.monthly_aggregates())
+        with storage.connect() as conn:
+            table = pd.read_sql_query(f"SELECT * FROM {storage.TABLE}", conn)
+        expected = sorted_cube(expected_aggregates(table))
+        storage.rebuild_monthly_aggregates()
+        rebuilt = sorted_cube(storage.monthly_aggregates())
+
+    merged = incremental.merge(expected, on=AGG_COLUMNS, how="outer", suffixes=("", "_expected"), indicator=True)
+    mismatch = merged[
+        (merged["_merge"] != "both")
+        | ((merged["Qty"] - merged["Qty_expected"]).abs() > 1e-6)
+        | (merged["Jumlah DO"] != merged["Jumlah DO_expected"])
+    ]
+    print(f"{operations} operasi, {len(rows)} DO, {len(incremental)} baris cube, {len(mismatch)} berbeda")
+    if not mismatch.empty:
+        print(mismatch.to_string(index=False))
+    if not incremental.equals(rebuilt):
+        print("❌ Cube inkremental berbeda dari rebuild_monthly_aggregates()")
+        return max(len(mismatch), 1)
+    return len(mismatch)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    sys.exit(1 if check(operations, seed) else 0)
+
+
+if __name__ == "__main__":
+    main()
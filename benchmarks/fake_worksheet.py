@@ -0,0 +1,181 @@
+"""
+Pengganti worksheet gspread di memori untuk benchmark GSheetsStorage tanpa akun Google.
+
+Hanya panggilan yang dipakai aplikasi yang diimplementasikan. Setiap panggilan API dihitung
+(calls) dan bisa diberi jeda buatan (latency_seconds) untuk meniru round trip jaringan.
+"""
+import re
+import time
+from collections import Counter
+
+import gspread
+from gspread.utils import a1_to_rowcol, numericise_all
+
+
+class FakeSpreadsheet:
+    """Spreadsheet berisi FakeWorksheet; mencatat waktu ubah seperti metadata Drive."""
+
+    def __init__(self, latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.calls = Counter()
+        self._worksheets = {}
+        self._revision = 0
+
+    def _api_call(self, name, modifies=False):
+        self.calls[name] += 1
+        if modifies:
+            self._revision += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        """Worksheet kosong baru (rows/cols hanya untuk kecocokan signature gspread)."""
+        self._api_call("add_worksheet", modifies=True)
+        if title in self._worksheets:
+            raise gspread.exceptions.APIError(f"Sheet '{title}' already exists")
+        worksheet = FakeWorksheet(self, title)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title):
+        self._api_call("worksheet")
+        if title not in self._worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def worksheets(self):
+        self._api_call("worksheets")
+        return list(self._worksheets.values())
+
+    def get_lastUpdateTime(self):
+        self._api_call("get_lastUpdateTime")
+        return f"rev-{self._revision}"
+
+    def batch_update(self, body):
+        """Hanya request deleteDimension (baris) yang didukung, seperti yang dipakai apply_batch."""
+        self._api_call("spreadsheet.batch_update", modifies=True)
+        by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for request in body["requests"]:
+            rng = request["deleteDimension"]["range"]
+            del by_id[rng["sheetId"]].rows[rng["startIndex"]:rng["endIndex"]]
+        return {}
+
+
+class FakeWorksheet:
+    """Worksheet di memori: rows = list baris (list nilai), baris 1 = header."""
+
+    def __init__(self, spreadsheet, title, rows=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = id(self)
+        self.rows = [list(r) for r in rows or []]
+
+    @classmethod
+    def from_records(cls, records, columns, latency_seconds=0.0, title="DO"):
+        """Worksheet baru (dalam FakeSpreadsheet sendiri) berisi header columns dan records."""
+        spreadsheet = FakeSpreadsheet(latency_seconds)
+        worksheet = spreadsheet._worksheets[title] = cls(spreadsheet, title)
+        worksheet.rows = [list(columns)] + [[record.get(col, "") for col in columns] for record in records]
+        return worksheet
+
+    @property
+    def row_count(self):
+        # Sheet asli selalu punya sisa baris kosong di bawah data
+        return len(self.rows) + 1000
+
+    def _call(self, name, modifies=False):
+        self.spreadsheet._api_call(name, modifies)
+
+    def _set(self, first_row, first_col, values):
+        for i, row_values in enumerate(values):
+            while len(self.rows) < first_row + i:
+                self.rows.append([])
+            row = self.rows[first_row + i - 1]
+            for j, value in enumerate(row_values):
+                while len(row) < first_col + j:
+                    row.append("")
+                row[first_col + j - 1] = value
+
+    # --- Baca ---
+
+    def row_values(self, row, **kwargs):
+        self._call("row_values")
+        return [str(v) for v in self.rows[row - 1]] if row <= len(self.rows) else []
+
+    def col_values(self, col, **kwargs):
+        self._call("col_values")
+        return [str(r[col - 1]) if col <= len(r) else "" for r in self.rows]
+
+    def cell(self, row, col, **kwargs):
+        self._call("cell")
+        value = self.rows[row - 1][col - 1] if row <= len(self.rows) and col <= len(self.rows[row - 1]) else None
+        return gspread.cell.Cell(row, col, value)
+
+    def get_all_values(self, **kwargs):
+        self._call("get_all_values")
+        return [[str(v) for v in r] for r in self.rows]
+
+    def get_all_records(self, **kwargs):
+        self._call("get_all_records")
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [
+            dict(zip(header, numericise_all([str(v) for v in r] + [""] * (len(header) - len(r)))))
+            for r in self.rows[1:]
+        ]
+
+    def get(self, range_name=None, **kwargs):
+        self._call("get")
+        match = re.match(r"([A-Z]+)(\d+)(?::([A-Z]+)(\d*))?", range_name or "A1")
+        first = int(match.group(2))
+        if match.group(4):
+            last = int(match.group(4))
+        else:
+            last = len(self.rows) if match.group(3) else first
+        return [[str(v) for v in r] for r in self.rows[first - 1:last] if r]
+
+    # --- Tulis ---
+
+    def update(self, values, range_name=None, **kwargs):
+        self._call("update", modifies=True)
+        if isinstance(values, str):
+            # Urutan argumen lama gspread: update(range_name, values)
+            values, range_name = range_name, values
+        row, col = a1_to_rowcol((range_name or "A1").split(":")[0])
+        self._set(row, col, values)
+        return {}
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update", modifies=True)
+        for item in data:
+            row, col = a1_to_rowcol(item["range"].split(":")[0])
+            self._set(row, col, item["values"])
+        return {}
+
+    def append_row(self, values, **kwargs):
+        self._call("append_row", modifies=True)
+        self.rows.append(list(values))
+        return {}
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows", modifies=True)
+        self.rows.extend(list(v) for v in values)
+        return {}
+
+    def delete_rows(self, start_index, end_index=None, **kwargs):
+        self._call("delete_rows", modifies=True)
+        del self.rows[start_index - 1:end_index or start_index]
+        return {}
+
+    def clear(self):
+        self._call("clear", modifies=True)
+        self.rows = []
+        return {}
+
+    def batch_clear(self, ranges):
+        self._call("batch_clear", modifies=True)
+        for range_name in ranges:
+            first_row = int(re.match(r"[A-Z]+(\d+)", range_name).group(1))
+            self.rows = self.rows[:first_row - 1]
+        return {}
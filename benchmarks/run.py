@@ -0,0 +1,196 @@
+"""
+Benchmark skala aplikasi DO: load, simpan, nomor DO, filter/pencarian rekap, ekspor Excel
+dan PDF pada data sintetis, tanpa akun Google (worksheet diganti FakeWorksheet).
+
+Jalankan dari root repo:
+    python -m benchmarks.run                                  # 1k / 10k / 100k baris
+    python -m benchmarks.run --rows 1000 10000 --latency-ms 150 --output hasil.json
+    python -m benchmarks.run --rows 10000 --compare hasil.json  # bandingkan dengan run lama
+
+Hasil berupa JSON: {"meta": {...}, "results": [{"case", "rows", "median_s", "min_s", "repeat", ...}]}.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from benchmarks.fake_worksheet import FakeWorksheet
+from benchmarks.synthetic import generate_frame, generate_rows
+from storage import NEW_COLUMNS, GSheetsStorage, MirroredStorage, PartitionedGSheetsStorage, SQLiteStorage
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+# Kasus mahal (menulis seluruh data) hanya diulang sekali
+HEAVY_CASES = {"sheets_rewrite_all", "export_xlsx"}
+
+
+def timed(fn, repeat):
+    """Menjalankan fn repeat kali; mengembalikan (median, min) detik."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), min(durations)
+
+
+def dataset_cases(rows, workdir, latency_seconds):
+    """Kasus benchmark untuk satu ukuran data: list (nama, fungsi). Setup tidak ikut diukur."""
+    from data_access import coerce_dataset
+    from export import write_xlsx
+    from search_index import FacetIndex, build_search_key, search_mask
+
+    records = list(generate_rows(rows))
+    sheet = FakeWorksheet.from_records(records, NEW_COLUMNS, latency_seconds)
+    local = SQLiteStorage(os.path.join(workdir, f"bench_{rows}.sqlite"))
+    local.replace_all(generate_frame(rows))
+    storage = MirroredStorage(local, queue_sync=True)
+    df = coerce_dataset(storage.load())
+    facets = FacetIndex(df)
+    search_key = build_search_key(df)
+    edited = dict(records[rows // 2])
+    counter = iter(range(10**9))
+
+    def sheets_fetch_initial():
+        GSheetsStorage(sheet).fetch_changes()
+
+    mirror = GSheetsStorage(sheet)
+    mirror.fetch_changes()
+
+    def sheets_sync_batch():
+        # 20 DO diedit + 5 DO baru dalam satu batch, seperti flush outbox
+        n = next(counter)
+        updates = [{**records[i], "Keterangan": f"edit {n}"} for i in range(0, rows, max(1, rows // 20))][:20]
+        new = [{**records[0], "NOMOR DO": f"BENCH-{n}-{i}"} for i in range(5)]
+        mirror.apply_batch(updates + new, [])
+
+    def sheets_fetch_after_edit():
+        # Edit langsung di tengah sheet: seluruh baris dibaca ulang
+        sheet.update([[f"edit {next(counter)}"]], "S5")
+        mirror.fetch_changes()
+
+    # Data 4 tahun sampai tahun berjalan, dipecah per tahun; edit di partisi tahun berjalan
+    this_year = datetime.now().year
+    partitioned = PartitionedGSheetsStorage(FakeWorksheet.from_records([], NEW_COLUMNS, latency_seconds))
+    partitioned.rewrite_all(generate_frame(rows, start=date(this_year - 3, 1, 1), days=365 * 4))
+    partitioned.fetch_changes()
+    current_partition = partitioned.partition(str(this_year)).worksheet
+
+    def sheets_partitioned_fetch_after_edit():
+        current_partition.update([[f"edit {next(counter)}"]], "S5")
+        partitioned.fetch_changes()
+
+    def save_do():
+        storage.upsert({**edited, "Keterangan": f"edit {next(counter)}"})
+
+    def next_do_number():
+        storage.peek_do_number()
+        storage.reserve_do_number()
+
+    selections = {
+        "Transportir": facets.options("Transportir")[:2],
+        "Jenis BBM": facets.options("Jenis BBM"),
+        "Month": facets.options("Month")[:3],
+    }
+
+    return [
+        ("sheets_fetch_initial", sheets_fetch_initial),
+        ("sheets_fetch_unchanged", mirror.fetch_changes),
+        ("sheets_sync_batch", sheets_sync_batch),
+        ("sheets_fetch_after_edit", sheets_fetch_after_edit),
+        ("sheets_partitioned_fetch_after_edit", sheets_partitioned_fetch_after_edit),
+        ("sheets_rewrite_all", lambda: GSheetsStorage(sheet).rewrite_all(df)),
+        ("sqlite_load", lambda: coerce_dataset(storage.load())),
+        # Jendela default halaman Rekap: bulan lalu + bulan ini (data sintetis = tahun 2024)
+        ("sqlite_query_2_months", lambda: coerce_dataset(storage.query("2024-11-01", "2024-12-31"))),
+        ("save_do", save_do),
+        ("next_do_number", next_do_number),
+        ("rekap_facet_index", lambda: FacetIndex(df)),
+        ("rekap_filter", lambda: df[facets.mask(selections)]),
+        ("rekap_facet_counts", lambda: facets.counts("Client", selections)),
+        ("search_index", lambda: build_search_key(df)),
+        ("search", lambda: df[search_mask(search_key, "client 01")]),
+        ("export_xlsx", lambda: write_xlsx(df, os.path.join(workdir, "bench.xlsx"), "Data")),
+    ]
+
+
+def pdf_case():
+    import pdf_surat_jalan
+    row = next(generate_rows(1))
+
+    def build_pdf_sha():
+        pdf_surat_jalan.build_pdf_sha(row)
+    build_pdf_sha()  # pemanasan import font/template
+    return build_pdf_sha
+
+
+def run(row_sizes, repeat, latency_seconds, cases=None, log=None):
+    results = []
+
+    def record(case, rows, fn):
+        if cases and case not in cases:
+            return
+        n = 1 if case in HEAVY_CASES else repeat
+        median_s, min_s = timed(fn, n)
+        results.append({"case": case, "rows": rows, "median_s": round(median_s, 6), "min_s": round(min_s, 6), "repeat": n})
+        if log:
+            log(f"{case:<36} {rows if rows is not None else '-':>8}  {median_s * 1000:10.2f} ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in row_sizes:
+            for case, fn in dataset_cases(rows, workdir, latency_seconds):
+                record(case, rows, fn)
+    if not cases or "build_pdf_sha" in cases:
+        record("build_pdf_sha", None, pdf_case())
+    return results
+
+
+def compare(results, baseline_path, log):
+    """Mencetak rasio waktu terhadap file hasil lama (>1 = lebih lambat dari sebelumnya)."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["rows"]): r["median_s"] for r in json.load(f)["results"]}
+    for r in results:
+        old = baseline.get((r["case"], r["rows"]))
+        if old:
+            log(f"{r['case']:<36} {r['rows'] if r['rows'] is not None else '-':>8}  "
+                f"{old * 1000:10.2f} -> {r['median_s'] * 1000:10.2f} ms  (x{r['median_s'] / old:.2f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark aplikasi DO dengan data sintetis.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Ukuran data (jumlah DO)")
+    parser.add_argument("--repeat", type=int, default=3, help="Pengulangan per kasus (median dilaporkan)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Jeda buatan per panggilan API worksheet")
+    parser.add_argument("--case", action="append", help="Hanya jalankan kasus ini (bisa diulang)")
+    parser.add_argument("--output", help="Tulis JSON ke file ini (default: stdout)")
+    parser.add_argument("--compare", help="File JSON hasil run sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+
+    log = lambda message: print(message, file=sys.stderr)
+    results = run(args.rows, args.repeat, args.latency_ms / 1000, set(args.case or ()), log)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency_ms,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.compare:
+        compare(results, args.compare, log)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
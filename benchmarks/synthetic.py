@@ -0,0 +1,58 @@
+"""
+Generator data DO sintetis untuk benchmark.
+
+Baris yang dihasilkan sudah berbentuk seperti isi database (kolom NEW_COLUMNS, tanggal ISO,
+NOMOR DO ddmmyy-NN unik per hari) dan deterministik untuk seed yang sama.
+"""
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+from storage import DATE_FORMAT, DO_DATE_FORMAT, NEW_COLUMNS, format_do_number
+
+JENIS_BBM = ["Biosolar Industri B40", "Pertamina Dex", "Dexlite", "Pertalite", "Pertamax"]
+KOTA = ["Surakarta", "Sukoharjo", "Karanganyar", "Boyolali", "Klaten", "Sragen", "Wonogiri", "Semarang"]
+NAMA = ["Budi", "Joko", "Slamet", "Agus", "Bambang", "Wahyu", "Eko", "Hadi", "Rudi", "Sri"]
+
+
+def generate_rows(rows, clients=50, transportirs=5, start=date(2024, 1, 1), days=365, seed=0):
+    """
+    Menghasilkan rows baris DO (dict) yang tersebar merata di rentang days hari sejak start.
+    clients / transportirs = jumlah nilai unik kolom Client / Transportir.
+    """
+    rng = random.Random(seed)
+    client_names = [f"PT Client {i:03d}" for i in range(clients)]
+    transportir_names = ["PT. SHA Solo"] + [f"PT Transport {i:02d}" for i in range(1, transportirs)]
+    sequence_per_day = {}
+    for i in range(rows):
+        day = start + timedelta(days=i * days // max(rows, 1))
+        prefix = day.strftime(DO_DATE_FORMAT)
+        sequence_per_day[prefix] = sequence_per_day.get(prefix, 0) + 1
+        client = rng.choice(client_names)
+        yield {
+            "No": i + 1,
+            "Month": day.strftime("%B"),
+            "SPO-Letter": f"SPO/{day.year}/{i:06d}",
+            "NOMOR DO": format_do_number(prefix, sequence_per_day[prefix]),
+            "Date": day.strftime(DATE_FORMAT),
+            "Source": "TBBM Boyolali",
+            "Transportir": rng.choice(transportir_names),
+            "Client": client,
+            "Site/Discharge Addr Line 1": f"Jl. {rng.choice(NAMA)} No. {rng.randint(1, 200)}",
+            "Site/Discharge Addr Line 2": rng.choice(KOTA),
+            "PO Client": f"PO-{day.year}-{rng.randint(1, 99999):05d}",
+            "Tgl PO": (day - timedelta(days=rng.randint(0, 14))).strftime(DATE_FORMAT),
+            "PO Pertamina": f"{rng.randint(10**9, 10**10 - 1)}",
+            "PIC Delivery": f"Pak {rng.choice(NAMA)}",
+            "Qty": float(rng.choice([5000, 8000, 10000, 16000, 24000])),
+            "Jenis BBM": rng.choice(JENIS_BBM),
+            "Fleet Number": f"AD {rng.randint(1000, 9999)} {rng.choice(['XY', 'AB', 'QT', 'KM'])}",
+            "Nama Driver": rng.choice(NAMA),
+            "Keterangan": "",
+        }
+
+
+def generate_frame(rows, **kwargs):
+    """generate_rows sebagai DataFrame (kolom teks, seperti hasil SQLiteStorage.load)."""
+    return pd.DataFrame(list(generate_rows(rows, **kwargs)), columns=NEW_COLUMNS)
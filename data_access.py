@@ -0,0 +1,267 @@
+"""
+Akses data bersama untuk semua halaman Streamlit.
+
+Modul ini memegang koneksi Google Sheets, storage (SQLite + mirror Google Sheets) dan
+satu DataFrame ter-cache yang dipakai oleh halaman Input, Rekap dan Pengaturan.
+Cache dikunci dengan versi data di SQLite, jadi setiap simpan/hapus dari halaman mana pun
+langsung membuat semua halaman memuat data terbaru.
+"""
+import threading
+import time
+
+import importlib
+
+import streamlit as st
+import pandas as pd
+
+import instrumentation
+from local_journal import LocalJournal
+from search_index import DOIndex, FacetIndex, build_search_key
+from storage import COLUMN_SCHEMA, DATE_FORMAT, NEW_COLUMNS, open_storage
+
+DB_SQLITE_PATH = "dbase.sqlite"
+# Salinan lokal (journal + snapshot Parquet), pengganti dbase.xlsx
+LOCAL_JOURNAL_DIR = "dbase_journal"
+# Jeda minimum antar percobaan menyambung ulang ke Google Sheets saat offline
+RECONNECT_INTERVAL_SECONDS = 60
+_RECONNECT_STATE = {"last_attempt": time.monotonic()}
+_RECONNECT_LOCK = threading.Lock()
+
+
+# --- Koneksi Google Sheets (Di-cache) ---
+
+def get_gsheet_config():
+    """Mengambil (url spreadsheet, nama worksheet) dari secrets.toml; string kosong jika tidak ada."""
+    try:
+        return (
+            st.secrets["gsheets_connection"]["spreadsheet"],
+            st.secrets["gsheets_connection"]["worksheet"],
+        )
+    except Exception:
+        return "", ""
+
+def gsheet_partitioned():
+    """True jika secrets.toml meminta worksheet dipecah per tahun: gsheets_connection.partition_by = "year"."""
+    try:
+        return st.secrets["gsheets_connection"].get("partition_by", "") == "year"
+    except Exception:
+        return False
+
+@st.cache_resource
+def get_gspread_client():
+    """Menginisialisasi koneksi gspread (gspread/google-auth baru dimuat di sini, sekali per proses)."""
+    try:
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        scopes = [
+            'https://www.googleapis.com/auth/spreadsheets',
+            'https://www.googleapis.com/auth/drive'
+        ]
+        if "gcp_service_account" not in st.secrets:
+            st.error("❌ ERROR: Kunci 'gcp_service_account' tidak ditemukan di file secrets.toml.")
+            return None
+
+        creds = Credentials.from_service_account_info(
+            st.secrets["gcp_service_account"],
+            scopes=scopes
+        )
+        return gspread.authorize(creds)
+    except Exception as e:
+        st.error(f"❌ Gagal terhubung ke Google Sheet (Otentikasi Kunci Gagal): {e}")
+        return None
+
+@st.cache_resource
+def get_worksheet():
+    """Memuat worksheet database dari spreadsheet di secrets.toml."""
+    gsheet_url, worksheet_name = get_gsheet_config()
+    if gsheet_url == "" or worksheet_name == "":
+        st.error("❌ Aplikasi tidak dapat terhubung. Cek kunci `gsheets_connection` di `secrets.toml` Anda.")
+        return None
+
+    client = get_gspread_client()
+    if client is None:
+        return None
+    import gspread
+    try:
+        with instrumentation.span("sheets.open_by_url"):
+            spreadsheet = client.open_by_url(gsheet_url)
+            worksheet = spreadsheet.worksheet(worksheet_name)
+        # Setiap panggilan API worksheet dicatat untuk halaman Diagnostik
+        return instrumentation.instrument_worksheet(worksheet)
+    except gspread.exceptions.WorksheetNotFound:
+        st.error(f"❌ Worksheet '{worksheet_name}' tidak ditemukan di Spreadsheet. Cek nama Worksheet.")
+        return None
+    except gspread.exceptions.SpreadsheetNotFound:
+        st.error(f"❌ Spreadsheet tidak ditemukan di URL ini: {gsheet_url}. Cek URL.")
+        return None
+    except Exception as e:
+        st.error(f"❌ Error saat memuat worksheet: {e}. PASTIKAN Anda sudah 'Share' Google Sheet ke email Service Account (sebagai Editor).")
+        return None
+
+@st.cache_resource
+def open_app_storage():
+    """Membuka database lokal (SQLite) dengan Google Sheets sebagai mirror dan journal sebagai salinan lokal."""
+    gsheet_url, worksheet_name = get_gsheet_config()
+    # Jika Google Sheets dikonfigurasi, simpan tetap masuk outbox walau sheet belum terjangkau
+    queue_sync = bool(gsheet_url and worksheet_name)
+    worksheet = get_worksheet()
+    journal = LocalJournal(LOCAL_JOURNAL_DIR)
+    try:
+        return open_storage(DB_SQLITE_PATH, worksheet, journal, queue_sync, gsheet_partitioned())
+    except Exception as e:
+        st.error(f"❌ Gagal membuka database lokal / sinkronisasi awal dari Google Sheets: {e}")
+        return open_storage(DB_SQLITE_PATH, journal=journal, queue_sync=queue_sync)
+
+def reconnect_mirror(storage):
+    """Mencoba lagi menyambung ke Google Sheets (maksimal sekali per RECONNECT_INTERVAL_SECONDS)."""
+    now = time.monotonic()
+    with _RECONNECT_LOCK:
+        if now - _RECONNECT_STATE["last_attempt"] < RECONNECT_INTERVAL_SECONDS:
+            return
+        _RECONNECT_STATE["last_attempt"] = now
+    get_worksheet.clear()
+    worksheet = get_worksheet()
+    if worksheet is None:
+        return
+    try:
+        open_storage(DB_SQLITE_PATH, worksheet, partitioned=gsheet_partitioned())
+    except Exception as e:
+        storage.last_error = f"{type(e).__name__}: {e}"
+
+def get_storage():
+    """Storage bersama; saat berjalan offline, koneksi ke Google Sheets dicoba ulang secara berkala."""
+    storage = open_app_storage()
+    if storage.mirror is None and storage.queue_sync:
+        reconnect_mirror(storage)
+    return storage
+
+
+# --- Dataset Bersama ---
+
+@instrumentation.timed("parse.coerce_dataset")
+def coerce_dataset(df):
+    """Menerapkan COLUMN_SCHEMA ke DataFrame hasil load dari storage (operasi vektor per kolom)."""
+    for col, kind in COLUMN_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if kind == "float":
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        elif kind == "date":
+            # Storage selalu menyimpan tanggal ISO; data rusak menjadi NaT
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+        else:
+            text = df[col].fillna('').astype(str)
+            if kind == "id":
+                # Hapus akhiran ".0" dari angka yang dibaca sebagai float (e.g., '1234.0' -> '1234')
+                text = text.str.replace(r"\.0$", "", regex=True)
+            df[col] = text.astype("category") if kind == "category" else text
+    return df
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_dataset_version(data_version):
+    """Memuat dan mengetik ulang seluruh data untuk satu versi data (versi = kunci cache)."""
+    instrumentation.cache_miss()
+    df = get_storage().load()
+    if df.empty or df.columns.empty:
+        return pd.DataFrame(columns=NEW_COLUMNS)
+    return coerce_dataset(df)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_dataset_range_version(data_version, date_from, date_to):
+    """Hanya DO dengan 'Date' di [date_from, date_to] (ISO), difilter di SQLite lewat index Date."""
+    instrumentation.cache_miss()
+    df = get_storage().query(date_from, date_to)
+    if df.empty or df.columns.empty:
+        return pd.DataFrame(columns=NEW_COLUMNS)
+    return coerce_dataset(df)
+
+def current_data_version():
+    """Versi data saat ini; None jika database tidak bisa dibaca."""
+    try:
+        return get_storage().data_version()
+    except Exception as e:
+        st.error(f"❌ Gagal membaca versi database: {e}")
+        return None
+
+def load_dataset(data_version=None, date_range=None):
+    """
+    Mengembalikan DataFrame seluruh DO (dipakai bersama semua halaman), atau hanya DO dengan
+    'Date' di date_range = (dari, sampai) dalam format ISO: waktu muat sebanding dengan rentangnya.
+    Berikan data_version jika hasilnya harus sejajar dengan index lain dari versi yang sama.
+    """
+    try:
+        if data_version is None:
+            data_version = get_storage().data_version()
+        if date_range is not None:
+            with instrumentation.cache_lookup("dataset_range"):
+                return load_dataset_range_version(data_version, *date_range)
+        with instrumentation.cache_lookup("dataset"):
+            return load_dataset_version(data_version)
+    except Exception as e:
+        st.error(f"❌ Gagal memuat data dari database: {e}")
+        return pd.DataFrame(columns=NEW_COLUMNS)
+
+# cache_resource (bukan cache_data): index hanya dibaca, jadi tidak perlu disalin setiap rerun
+@st.cache_resource(max_entries=4, show_spinner=False)
+def search_key_version(data_version, date_range=None):
+    instrumentation.cache_miss()
+    with instrumentation.span("parse.build_search_key"):
+        return build_search_key(load_dataset(data_version, date_range))
+
+def load_search_key(data_version, date_range=None):
+    """Kolom kunci pencarian (lihat search_index) untuk dataset versi data_version (dan date_range)."""
+    with instrumentation.cache_lookup("search_key"):
+        return search_key_version(data_version, date_range)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def monthly_aggregates_version(data_version):
+    instrumentation.cache_miss()
+    return get_storage().monthly_aggregates()
+
+def load_monthly_aggregates(data_version):
+    """Cube agregat bulanan (dijaga SQLite secara inkremental) untuk versi data_version."""
+    with instrumentation.cache_lookup("monthly_aggregates"):
+        return monthly_aggregates_version(data_version)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def facet_index_version(data_version, date_range=None):
+    instrumentation.cache_miss()
+    with instrumentation.span("parse.facet_index"):
+        return FacetIndex(load_dataset(data_version, date_range))
+
+def load_facet_index(data_version, date_range=None):
+    """FacetIndex (filter Tahun/Bulan/Transportir/BBM/Client) untuk dataset versi data_version (dan date_range)."""
+    with instrumentation.cache_lookup("facet_index"):
+        return facet_index_version(data_version, date_range)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def do_index_version(data_version):
+    instrumentation.cache_miss()
+    with instrumentation.span("parse.do_index"):
+        return DOIndex(load_dataset(data_version))
+
+def load_do_index(data_version=None):
+    """DOIndex (NOMOR DO -> baris) untuk seluruh dataset versi data_version (default: versi terbaru)."""
+    if data_version is None:
+        data_version = current_data_version()
+    with instrumentation.cache_lookup("do_index"):
+        return do_index_version(data_version)
+
+
+# --- Modul Berat (Lazy) ---
+
+@st.cache_resource(show_spinner=False)
+def prewarm_modules(*module_names):
+    """
+    Memuat modul berat (ReportLab, openpyxl) di background thread, sekali per proses.
+    Dipanggil di akhir halaman: halaman tampil dulu, klik Cetak/Download pertama tidak menunggu import.
+    """
+    def load():
+        for name in module_names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                # Error import akan muncul lagi (dan ditampilkan) saat modul benar-benar dipakai
+                pass
+    threading.Thread(target=load, name="prewarm-imports", daemon=True).start()
@@ -0,0 +1,124 @@
+"""
+Ekspor data DO ke Excel/CSV.
+
+- Excel ditulis dengan openpyxl mode write-only dan CSV ditulis per potongan, jadi memori
+  tidak melonjak untuk data besar (tidak ada salinan DataFrame / workbook penuh di memori).
+- Hasil disimpan di EXPORT_CACHE_DIR dengan nama dari hash (versi data, format, filter);
+  ekspor yang sama tidak dibuat ulang sampai data berubah. Versi data dari storage memuat
+  identitas database, jadi database yang dibuat ulang tidak memakai file ekspor lama.
+- Halaman memanggil fungsi ini dari callback download (lazy), bukan di setiap rerun.
+
+Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga dari skrip/CLI.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+import instrumentation
+from storage import DATE_COLUMNS, DATE_FORMAT
+
+EXPORT_CACHE_DIR = "exports_cache"
+# Jumlah file ekspor yang disimpan; yang paling lama dipakai dihapus lebih dulu
+MAX_CACHED_EXPORTS = 20
+CHUNK_ROWS = 5000
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIME = 'text/csv'
+
+
+def format_chunk(chunk):
+    """Tanggal -> teks 'YYYY-MM-DD' (vektor per potongan) agar Excel/CSV membacanya dengan benar."""
+    chunk = chunk.copy()
+    for col in DATE_COLUMNS:
+        if col in chunk.columns and hasattr(chunk[col], "dt"):
+            chunk[col] = chunk[col].dt.strftime(DATE_FORMAT)
+    return chunk
+
+
+def iter_chunks(df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield format_chunk(df.iloc[start:start + chunk_rows])
+
+
+def cell_value(value):
+    """NaN/NaT/NA -> sel kosong (openpyxl menulis NaN sebagai angka tidak valid)."""
+    return None if pd.isna(value) else value
+
+
+def write_xlsx(df, path, sheet_name):
+    """Menulis df ke file .xlsx baris demi baris (openpyxl write-only)."""
+    # openpyxl baru dimuat saat ekspor Excel pertama, bukan saat halaman dibuka
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    sheet.append([str(col) for col in df.columns])
+    for chunk in iter_chunks(df):
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([cell_value(v) for v in row])
+    workbook.save(path)
+
+
+def write_csv(df, path):
+    """Menulis df ke file CSV (UTF-8) per potongan CHUNK_ROWS baris."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(iter_chunks(df)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+        if df.empty:
+            df.to_csv(f, index=False)
+
+
+def export_path(data_version, fmt, filters=None):
+    """Lokasi file cache untuk kombinasi versi data + format + parameter filter."""
+    key = json.dumps({"version": data_version, "filters": filters or {}}, sort_keys=True, default=str)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(EXPORT_CACHE_DIR, f"export_{digest}.{fmt}")
+
+
+def prune_export_cache(keep=MAX_CACHED_EXPORTS):
+    files = sorted(glob.glob(os.path.join(EXPORT_CACHE_DIR, "export_*")), key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_export(df, fmt, data_version, filters=None, sheet_name="Data"):
+    """
+    Mengembalikan path file ekspor (fmt 'xlsx' atau 'csv') untuk df, membuatnya hanya jika
+    belum ada di cache. filters harus menggambarkan isi df (versi data + filter halaman).
+    """
+    path = export_path(data_version, fmt, filters)
+    if os.path.exists(path):
+        os.utime(path)
+        instrumentation.count("export.cache.hit")
+        return path
+    instrumentation.count("export.cache.miss")
+
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    # Tulis ke file sementara lalu rename: pembaca lain tidak pernah melihat file setengah jadi
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with instrumentation.span(f"export.{fmt}"):
+            if fmt == "xlsx":
+                write_xlsx(df, tmp_path, sheet_name)
+            else:
+                write_csv(df, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_export_cache()
+    return path
+
+
+def export_reader(df, fmt, data_version, filters=None, sheet_name="Data"):
+    """Callable untuk st.download_button(data=...): ekspor baru dibuat saat tombol diklik."""
+    def read_export():
+        with open(cached_export(df, fmt, data_version, filters, sheet_name), "rb") as f:
+            return f.read()
+    return read_export
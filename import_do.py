@@ -0,0 +1,305 @@
+"""
+Import massal DO dari file CSV / Excel tanpa membuka aplikasi Streamlit.
+
+Contoh (dari root repo):
+    python import_do.py pesanan.xlsx
+    python import_do.py pesanan.csv --pdf-dir surat_jalan --dry-run
+
+- File dibaca baris demi baris (csv.DictReader / openpyxl read-only) dan disimpan per
+  potongan CHUNK_ROWS baris, jadi memori tetap kecil untuk puluhan ribu baris.
+- Setiap baris divalidasi dan diseragamkan ke kolom NEW_COLUMNS. Baris tanpa NOMOR DO
+  mendapat nomor baru (format yang sama dengan form Input, dipesan per potongan);
+  baris dengan NOMOR DO yang sudah ada memperbarui DO tersebut. Angka teks memakai format
+  Indonesia (8.000 / 8.000,5); pemisah yang ambigu seperti '8,000' ditolak sebagai error baris.
+- Data ditulis ke database lokal yang sama dengan aplikasi (SQLite + journal). Jika koneksi
+  Google Sheets dikonfigurasi di secrets.toml (atau dengan --sync), perubahan masuk outbox dan
+  dikirim ke Google Sheets oleh aplikasi yang sedang berjalan.
+- --pdf-dir membuat PDF Surat Jalan untuk setiap DO yang diimport (paralel, per potongan).
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import tomllib
+from datetime import datetime
+
+from local_journal import LocalJournal
+from storage import DATE_COLUMNS, NEW_COLUMNS, COLUMN_SCHEMA, normalize_row, open_storage
+
+# Sama dengan data_access.py (tidak diimport dari sana agar CLI tidak memuat Streamlit)
+DB_SQLITE_PATH = "dbase.sqlite"
+LOCAL_JOURNAL_DIR = "dbase_journal"
+# Lokasi secrets.toml yang dibaca Streamlit (folder proyek, lalu folder user)
+SECRETS_PATHS = [
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+]
+
+CHUNK_ROWS = 1000
+# Format tanggal yang diterima di file input (selain sel tanggal Excel)
+INPUT_DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"]
+
+
+class ImportRowError(ValueError):
+    """Satu baris file input tidak valid; baris dilewati dan dilaporkan."""
+
+
+def gsheets_configured():
+    """True jika secrets.toml berisi koneksi Google Sheets (seperti data_access.get_gsheet_config)."""
+    for path in SECRETS_PATHS:
+        try:
+            with open(path, "rb") as f:
+                connection = tomllib.load(f).get("gsheets_connection", {})
+        except (OSError, tomllib.TOMLDecodeError):
+            continue
+        if connection.get("spreadsheet") and connection.get("worksheet"):
+            return True
+    return False
+
+
+# --- Baca File Input (Streaming) ---
+
+def iter_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        yield reader.fieldnames or []
+        for row in reader:
+            yield row
+
+def iter_xlsx(path, sheet_name=None):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        yield header
+        for values in rows:
+            if values is None or all(v is None or str(v).strip() == "" for v in values):
+                continue
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+def iter_input_rows(path, sheet_name=None):
+    """Menghasilkan header lalu setiap baris (dict) dari file CSV atau XLSX."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return iter_csv(path)
+    if ext in (".xlsx", ".xlsm"):
+        return iter_xlsx(path, sheet_name)
+    raise ValueError(f"Format file tidak didukung: {ext} (gunakan .csv atau .xlsx)")
+
+
+# --- Validasi Baris ---
+
+def parse_date(value, column):
+    """Sel tanggal / teks tanggal -> date; None jika kosong."""
+    if value is None or str(value).strip() == "":
+        return None
+    if hasattr(value, "strftime"):
+        return value.date() if hasattr(value, "date") else value
+    text = str(value).strip()
+    for fmt in INPUT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f"{column} bukan tanggal yang dikenali: {text!r}")
+
+# Angka teks format Indonesia: titik = ribuan, koma = desimal (seperti di PDF: '8.000', '16.000,5')
+INDONESIAN_NUMBER = re.compile(r"-?\d{1,3}(\.\d{3})+(,\d+)?")
+DECIMAL_COMMA = re.compile(r"-?\d+,\d+")
+PLAIN_NUMBER = re.compile(r"-?\d+(\.\d+)?")
+
+def parse_number_text(text):
+    """Teks angka -> float; None jika pemisahnya tidak jelas (mis. '8,000': 8 ribu atau 8,0?)."""
+    text = text.replace(" ", "")
+    if INDONESIAN_NUMBER.fullmatch(text):
+        return float(text.replace(".", "").replace(",", "."))
+    if DECIMAL_COMMA.fullmatch(text) and len(text.rsplit(",", 1)[1]) != 3:
+        return float(text.replace(",", "."))
+    if PLAIN_NUMBER.fullmatch(text):
+        # Titik yang bukan pola ribuan (mis. '8000.5') = titik desimal dari ekspor mesin
+        return float(text)
+    return None
+
+def parse_float(value, column):
+    if value is None or str(value).strip() == "":
+        return None
+    if isinstance(value, str):
+        number = parse_number_text(value.strip())
+        if number is None:
+            raise ImportRowError(
+                f"{column} bukan angka yang jelas: {value!r} (pakai titik untuk ribuan dan koma untuk desimal, mis. 8.000 atau 8.000,5)"
+            )
+        return number
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        raise ImportRowError(f"{column} bukan angka: {value!r}")
+
+def clean_row(raw_row, today):
+    """
+    Memvalidasi satu baris input dan mengisi nilai default seperti form Input
+    (Date = hari ini, Month dari Date). "No" dan NOMOR DO kosong diisi saat disimpan.
+    """
+    row = {}
+    for col in NEW_COLUMNS:
+        value = raw_row.get(col)
+        if isinstance(value, str):
+            value = value.strip()
+        if col in DATE_COLUMNS:
+            value = parse_date(value, col)
+        elif COLUMN_SCHEMA[col] == "float":
+            value = parse_float(value, col)
+        elif value is None:
+            value = ""
+        else:
+            value = str(value).strip()
+            if COLUMN_SCHEMA[col] == "id" and value.endswith(".0"):
+                value = value[:-2]
+        row[col] = value
+
+    if row["Qty"] is None:
+        raise ImportRowError("Qty wajib diisi")
+    if row["Qty"] < 0:
+        raise ImportRowError(f"Qty tidak boleh negatif: {row['Qty']}")
+    if not row["Client"]:
+        raise ImportRowError("Client wajib diisi")
+    row["Date"] = row["Date"] or today
+    row["Month"] = row["Month"] or row["Date"].strftime("%B")
+    return row
+
+
+# --- Import ---
+
+def write_pdfs(executor, rows, pdf_dir):
+    """Membuat PDF untuk satu potongan DO; mengembalikan daftar error (NOMOR DO, pesan)."""
+    from pdf_surat_jalan import render_pdf_job, safe_pdf_filename
+    errors = []
+    for result in executor.map(render_pdf_job, rows, chunksize=max(1, len(rows) // 32)):
+        if result["pdf"] is None:
+            errors.append((result["NOMOR DO"], result["Error"]))
+            continue
+        with open(os.path.join(pdf_dir, safe_pdf_filename(result["NOMOR DO"])), "wb") as f:
+            f.write(result["pdf"])
+    return errors
+
+def save_chunk(storage, rows, next_no):
+    """
+    Mengisi NOMOR DO / No lalu menyimpan satu potongan dalam satu transaksi.
+    Mengembalikan (baris tersimpan, No berikutnya).
+    """
+    new_numbers = iter(storage.reserve_do_numbers(sum(1 for r in rows if not r["NOMOR DO"])))
+    saved = []
+    for row in rows:
+        if not row["NOMOR DO"]:
+            row["NOMOR DO"] = next(new_numbers)
+        elif row["No"] is None:
+            existing = storage.get(row["NOMOR DO"])
+            if existing and existing.get("No") not in (None, ""):
+                row["No"] = existing["No"]
+        if row["No"] is None:
+            row["No"] = next_no
+            next_no += 1
+        saved.append(normalize_row(row))
+    storage.upsert_many(saved)
+    return saved, next_no
+
+def run_import(path, storage=None, pdf_dir=None, sheet_name=None, dry_run=False, chunk_rows=CHUNK_ROWS, log=print):
+    """
+    Mengimport file path ke storage. Mengembalikan ringkasan
+    {"dibaca", "disimpan", "error": [(baris, pesan)], "pdf_error": [(NOMOR DO, pesan)]}.
+    """
+    rows = iter_input_rows(path, sheet_name)
+    header = next(rows, [])
+    known = [col for col in header if col in NEW_COLUMNS]
+    if not known:
+        raise ValueError(f"Header file tidak berisi kolom yang dikenal. Kolom yang diharapkan: {', '.join(NEW_COLUMNS)}")
+    unknown = [col for col in header if col and col not in NEW_COLUMNS]
+    if unknown:
+        log(f"⚠️ Kolom diabaikan: {', '.join(unknown)}")
+
+    summary = {"dibaca": 0, "disimpan": 0, "error": [], "pdf_error": []}
+    today = datetime.now().date()
+    next_no = None if dry_run else storage.max_row_number() + 1
+    if pdf_dir and not dry_run:
+        os.makedirs(pdf_dir, exist_ok=True)
+    executor = None
+    if pdf_dir and not dry_run:
+        from pdf_surat_jalan import process_pool
+        executor = process_pool()
+
+    def flush(chunk):
+        nonlocal next_no
+        if dry_run or not chunk:
+            return
+        saved, next_no = save_chunk(storage, chunk, next_no)
+        summary["disimpan"] += len(saved)
+        if executor is not None:
+            summary["pdf_error"].extend(write_pdfs(executor, saved, pdf_dir))
+        log(f"... {summary['disimpan']} DO tersimpan")
+
+    try:
+        chunk = []
+        # Baris 1 = header
+        for line_number, raw_row in enumerate(rows, start=2):
+            summary["dibaca"] += 1
+            try:
+                chunk.append(clean_row(raw_row, today))
+            except ImportRowError as e:
+                summary["error"].append((line_number, str(e)))
+                continue
+            if len(chunk) >= chunk_rows:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import massal Delivery Order dari CSV/XLSX.")
+    parser.add_argument("file", help="File .csv atau .xlsx dengan header kolom seperti database")
+    parser.add_argument("--sheet", help="Nama sheet Excel (default: sheet aktif)")
+    parser.add_argument("--pdf-dir", help="Folder tujuan PDF Surat Jalan untuk setiap DO yang diimport")
+    parser.add_argument("--db", default=DB_SQLITE_PATH, help=f"Database SQLite (default: {DB_SQLITE_PATH})")
+    parser.add_argument("--journal-dir", default=LOCAL_JOURNAL_DIR, help=f"Folder journal lokal (default: {LOCAL_JOURNAL_DIR})")
+    parser.add_argument(
+        "--sync", dest="sync", action="store_true", default=None,
+        help="Antrikan perubahan untuk Google Sheets (default: hanya jika dikonfigurasi di secrets.toml)"
+    )
+    parser.add_argument("--no-sync", dest="sync", action="store_false", help="Jangan antrikan perubahan untuk Google Sheets")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya validasi, tidak menyimpan apa pun")
+    args = parser.parse_args(argv)
+
+    storage = None
+    if not args.dry_run:
+        # Tanpa mirror Google Sheets tidak ada yang mengosongkan outbox
+        queue_sync = gsheets_configured() if args.sync is None else args.sync
+        storage = open_storage(args.db, journal=LocalJournal(args.journal_dir), queue_sync=queue_sync)
+    try:
+        summary = run_import(args.file, storage, args.pdf_dir, args.sheet, args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    for line_number, message in summary["error"]:
+        print(f"❌ Baris {line_number}: {message}", file=sys.stderr)
+    for nomor_do, message in summary["pdf_error"]:
+        print(f"❌ PDF {nomor_do}: {message}", file=sys.stderr)
+    print(
+        f"✅ {summary['dibaca']} baris dibaca, {summary['disimpan']} DO disimpan, "
+        f"{len(summary['error'])} baris error, {len(summary['pdf_error'])} PDF gagal."
+    )
+    if storage is not None and storage.queue_sync:
+        print(f"Antrian sinkronisasi ke Google Sheets: {storage.pending_count()} perubahan (dikirim oleh aplikasi).")
+    return 1 if summary["error"] or summary["pdf_error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Pengukuran ringan untuk jalur panas aplikasi (panggilan Google Sheets, cache, parsing,
+pembuatan PDF, ekspor).
+
+- span(name)       : context manager pencatat durasi (dan error) satu langkah;
+- timed(name)      : decorator yang membungkus fungsi dengan span;
+- count(name)      : counter biasa (mis. hit/miss cache);
+- cache_lookup / cache_miss : mencatat hit/miss untuk fungsi st.cache_*;
+- instrument_worksheet(ws)  : proxy worksheet gspread yang mencatat setiap panggilan API;
+- begin_rerun(page): mencatat jumlah panggilan Sheets per rerun halaman.
+
+Semua data disimpan di memori proses (hilang saat restart) dan dibaca oleh halaman
+Diagnostik lewat snapshot(). Modul ini tidak bergantung pada Streamlit.
+"""
+import contextlib
+import functools
+import threading
+import time
+from collections import deque
+
+# Jumlah durasi terakhir per span yang disimpan untuk menghitung persentil
+MAX_SAMPLES = 2048
+MAX_RERUNS = 100
+SHEETS_PREFIX = "sheets."
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+_reruns = deque(maxlen=MAX_RERUNS)
+_local = threading.local()
+_started = time.time()
+
+
+class SpanStats:
+    """Statistik satu span: jumlah, error, total durasi dan sampel durasi terakhir."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, duration, failed):
+        self.count += 1
+        self.errors += failed
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+
+def percentile(sorted_values, q):
+    """Persentil q (0-100) dari list yang sudah terurut (nearest-rank)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# --- Span & Counter ---
+
+def record(name, duration, failed=False):
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = SpanStats()
+        stats.add(duration, failed)
+    if name.startswith(SHEETS_PREFIX):
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None:
+            rerun["sheets_calls"] += 1
+
+@contextlib.contextmanager
+def span(name):
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException as e:
+        # st.stop()/st.rerun() memakai exception untuk alur normal; bukan error
+        failed = isinstance(e, Exception) and type(e).__module__.split(".")[0] != "streamlit"
+        raise
+    finally:
+        record(name, time.perf_counter() - start, failed)
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+# --- Cache Hit/Miss ---
+
+@contextlib.contextmanager
+def cache_lookup(name):
+    """
+    Membungkus pemanggilan fungsi ter-cache. Jika isi fungsi berjalan (cache_miss dipanggil
+    di dalamnya) dihitung sebagai miss, selain itu hit.
+    """
+    previous = getattr(_local, "cache_missed", None)
+    _local.cache_missed = False
+    try:
+        with span(f"cache.{name}"):
+            yield
+    finally:
+        count(f"cache.{name}.{'miss' if _local.cache_missed else 'hit'}")
+        _local.cache_missed = previous
+
+def cache_miss():
+    """Dipanggil di dalam isi fungsi st.cache_*: isi hanya berjalan saat cache miss."""
+    _local.cache_missed = True
+
+
+# --- Google Sheets ---
+
+class InstrumentedProxy:
+    """Proxy objek gspread (worksheet/spreadsheet): setiap method publik dicatat sebagai span sheets.<method>."""
+
+    def __init__(self, target, prefix):
+        self._target = target
+        self._prefix = prefix
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if attr == "spreadsheet":
+            return InstrumentedProxy(value, f"{SHEETS_PREFIX}spreadsheet.")
+        if attr.startswith("_") or not callable(value):
+            return value
+        name = f"{self._prefix}{attr}"
+
+        @functools.wraps(value)
+        def call(*args, **kwargs):
+            with span(name):
+                return value(*args, **kwargs)
+        return call
+
+def instrument_worksheet(worksheet):
+    return None if worksheet is None else InstrumentedProxy(worksheet, SHEETS_PREFIX)
+
+
+# --- Rerun Halaman ---
+
+def begin_rerun(page):
+    """
+    Dipanggil di awal setiap halaman. Streamlit menjalankan setiap rerun di thread baru,
+    jadi panggilan Sheets dari thread ini dihitung untuk rerun ini (bukan sync di background).
+    """
+    rerun = {"page": page, "started": time.time(), "sheets_calls": 0}
+    _local.rerun = rerun
+    with _lock:
+        _reruns.append(rerun)
+
+
+# --- Snapshot ---
+
+def snapshot():
+    """Salinan data saat ini: {"spans": [...], "counters": {...}, "reruns": [...], "since": epoch}."""
+    with _lock:
+        spans = [
+            (name, stats.count, stats.errors, stats.total, stats.max, sorted(stats.samples))
+            for name, stats in _spans.items()
+        ]
+        counters = dict(_counters)
+        reruns = [dict(r) for r in _reruns]
+    rows = []
+    for name, n, errors, total, max_duration, samples in sorted(spans):
+        rows.append({
+            "span": name, "count": n, "errors": errors,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "max_ms": max_duration * 1000,
+            "total_s": total,
+        })
+    return {"spans": rows, "counters": counters, "reruns": reruns, "since": _started}
+
+def reset():
+    global _started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _reruns.clear()
+        _started = time.time()
@@ -0,0 +1,277 @@
+"""
+Salinan lokal database dalam bentuk journal append-only + snapshot Parquet.
+
+Menggantikan penulisan ulang dbase.xlsx di setiap simpan:
+
+- setiap simpan/hapus menambah SATU baris JSON ke journal.jsonl (biaya O(1));
+- setelah COMPACT_EVERY record, journal dipadatkan ke snapshot Parquet per bulan
+  (snapshot/month=YYYY-MM.parquet) dan hanya bulan yang berubah yang ditulis ulang;
+- load() = snapshot + replay journal, jauh lebih cepat dari membaca xlsx.
+
+Folder journal bisa dipakai beberapa proses sekaligus (aplikasi + import_do.py): pemadatan
+dan pergantian file journal dikunci dengan fcntl.flock pada file kunci di folder journal.
+
+Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga dari skrip/CLI.
+"""
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: tanpa flock, hanya dikunci antar thread di proses ini
+    fcntl = None
+
+import pandas as pd
+
+from storage import COLUMN_SCHEMA, NEW_COLUMNS, normalize_row
+
+NO_MONTH = "tanpa-tanggal"
+
+
+def row_month(row):
+    """Partisi snapshot untuk satu baris: 'YYYY-MM' dari kolom Date."""
+    date = str(row.get("Date") or "")
+    return date[:7] if len(date) >= 7 else NO_MONTH
+
+
+def rows_to_frame(rows):
+    """DataFrame dengan tipe kolom stabil (angka / teks) agar skema Parquet konsisten antar bulan."""
+    df = pd.DataFrame(rows, columns=NEW_COLUMNS)
+    for col in NEW_COLUMNS:
+        if COLUMN_SCHEMA.get(col) == "float":
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        else:
+            df[col] = df[col].fillna("").astype(str)
+    return df
+
+
+class FileLock:
+    """
+    Kunci fcntl.flock pada satu file kunci (shared / exclusive). Setiap hold() membuka file
+    sendiri, jadi kunci juga berlaku antar thread di proses yang sama.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def hold(self, shared=False, blocking=True):
+        """Menghasilkan True selama kunci dipegang; False jika blocking=False dan kunci sedang dipakai."""
+        if fcntl is None:
+            acquired = self._thread_lock.acquire(blocking)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    self._thread_lock.release()
+            return
+        with open(self.path, "a") as f:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(f, mode if blocking else mode | fcntl.LOCK_NB)
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class LocalJournal:
+    """Journal append-only (JSON lines) dengan pemadatan berkala ke Parquet per bulan."""
+
+    COMPACT_EVERY = 500
+    # Jeda sebelum mencoba pemadatan lagi setelah gagal (mis. disk penuh)
+    COMPACT_RETRY_SECONDS = 60
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.journal_path = os.path.join(folder, "journal.jsonl")
+        self.compacting_path = os.path.join(folder, "journal.compacting.jsonl")
+        self.snapshot_dir = os.path.join(folder, "snapshot")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Pemadatan: exclusive; load: shared (snapshot + journal dibaca dalam keadaan konsisten)
+        self._compact_lock = FileLock(os.path.join(folder, "compact.lock"))
+        # Penulisan journal: shared; pergantian journal.jsonl -> journal.compacting.jsonl: exclusive
+        self._journal_lock = FileLock(os.path.join(folder, "journal.lock"))
+        self._records = self._count_records(self.journal_path)
+        self._compacting = False
+        self._compact_retry_at = 0.0
+
+    @staticmethod
+    def _count_records(path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for _ in f)
+
+    def is_empty(self):
+        return (
+            self._records == 0
+            and not os.path.exists(self.compacting_path)
+            and not glob.glob(os.path.join(self.snapshot_dir, "*.parquet"))
+        )
+
+    # --- Tulis ---
+
+    def _append(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records)
+        with self._lock, self._journal_lock.hold(shared=True):
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._records += len(records)
+            # Satu thread pemadatan sekaligus, dan tidak setiap simpan setelah pemadatan gagal
+            compact_due = (
+                self._records >= self.COMPACT_EVERY
+                and not self._compacting
+                and time.time() >= self._compact_retry_at
+            )
+            if compact_due:
+                self._compacting = True
+        if compact_due:
+            threading.Thread(target=self._compact_in_background, name="journal-compact", daemon=True).start()
+
+    def record_upserts(self, data_rows):
+        now = time.time()
+        self._append([{"ts": now, "op": "upsert", "row": normalize_row(r)} for r in data_rows])
+
+    def record_deletes(self, nomor_dos):
+        now = time.time()
+        self._append([{"ts": now, "op": "delete", "NOMOR DO": str(k).strip()} for k in nomor_dos])
+
+    def record_reset(self, data_rows):
+        """Mengganti seluruh isi salinan lokal (dipakai saat database di-seed ulang)."""
+        now = time.time()
+        self._append([{"ts": now, "op": "reset"}] + [{"ts": now, "op": "upsert", "row": normalize_row(r)} for r in data_rows])
+
+    # --- Baca ---
+
+    @staticmethod
+    def _read_journal(path):
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Baris terakhir bisa terpotong jika proses mati saat menulis
+                    continue
+
+    def _journal_delta(self, paths):
+        """
+        Ringkasan journal: {NOMOR DO: baris terakhir, atau None jika dihapus} dan apakah ada
+        'reset' (seluruh snapshot sebelumnya tidak berlaku lagi).
+        """
+        changes, reset = {}, False
+        for path in paths:
+            for record in self._read_journal(path):
+                op = record.get("op")
+                if op == "reset":
+                    changes, reset = {}, True
+                elif op == "upsert":
+                    changes[record["row"]["NOMOR DO"]] = record["row"]
+                elif op == "delete":
+                    changes[record["NOMOR DO"]] = None
+        return changes, reset
+
+    def _snapshot_files(self):
+        return sorted(glob.glob(os.path.join(self.snapshot_dir, "month=*.parquet")))
+
+    @staticmethod
+    def _partition_month(path):
+        return os.path.basename(path)[len("month="):-len(".parquet")]
+
+    def _load_snapshot(self, months=None, columns=None):
+        """
+        Snapshot sebagai satu DataFrame dengan kolom bantu '_month' (nama partisi).
+        months membatasi partisi yang dibaca, columns membatasi kolom.
+        """
+        frames = []
+        for path in self._snapshot_files():
+            month = self._partition_month(path)
+            if months is not None and month not in months:
+                continue
+            frame = pd.read_parquet(path, columns=columns)
+            frame["_month"] = month
+            frames.append(frame)
+        if not frames:
+            return rows_to_frame([]).assign(_month="")
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _apply_delta(snapshot, changes, reset):
+        base = snapshot.iloc[0:0] if reset else snapshot[~snapshot["NOMOR DO"].isin(list(changes))]
+        new_rows = [row for row in changes.values() if row is not None]
+        if not new_rows:
+            return base.drop(columns="_month")
+        return pd.concat([base.drop(columns="_month"), rows_to_frame(new_rows)], ignore_index=True)
+
+    def load(self):
+        """Seluruh data salinan lokal sebagai DataFrame (snapshot + journal)."""
+        with self._compact_lock.hold(shared=True):
+            changes, reset = self._journal_delta([self.compacting_path, self.journal_path])
+            return self._apply_delta(self._load_snapshot(), changes, reset)
+
+    # --- Pemadatan ---
+
+    def _compact_in_background(self):
+        try:
+            # Proses lain yang sedang memadatkan ikut memadatkan journal yang sama
+            self.compact(blocking=False)
+        except Exception:
+            self._compact_retry_at = time.time() + self.COMPACT_RETRY_SECONDS
+            raise
+        finally:
+            self._compacting = False
+
+    def compact(self, blocking=True):
+        """
+        Menulis ulang bulan yang berubah ke snapshot Parquet lalu mengosongkan journal.
+        Mengembalikan False jika blocking=False dan pemadatan lain sedang berjalan.
+        """
+        with self._compact_lock.hold(blocking=blocking) as acquired:
+            if not acquired:
+                return False
+            with self._lock, self._journal_lock.hold():
+                if not os.path.exists(self.compacting_path):
+                    if not os.path.exists(self.journal_path):
+                        return True
+                    # Penulis berikutnya langsung memakai journal baru
+                    os.replace(self.journal_path, self.compacting_path)
+                    self._records = 0
+
+            changes, reset = self._journal_delta([self.compacting_path])
+            if reset:
+                touched = {self._partition_month(path) for path in self._snapshot_files()}
+            else:
+                # Cari bulan lama dari DO yang berubah dengan membaca kolom NOMOR DO saja
+                keys = self._load_snapshot(columns=["NOMOR DO"])
+                touched = set(keys.loc[keys["NOMOR DO"].isin(list(changes)), "_month"])
+            touched.update(row_month(row) for row in changes.values() if row is not None)
+
+            merged = self._apply_delta(self._load_snapshot(months=touched), changes, reset)
+            months = merged["Date"].map(lambda d: row_month({"Date": d}))
+            for month in touched:
+                path = os.path.join(self.snapshot_dir, f"month={month}.parquet")
+                part = merged[months == month]
+                if not part.empty:
+                    tmp_path = f"{path}.tmp"
+                    part.to_parquet(tmp_path, index=False)
+                    os.replace(tmp_path, path)
+                elif os.path.exists(path):
+                    os.remove(path)
+            os.remove(self.compacting_path)
+            return True
@@ -1,26 +1,14 @@
 import streamlit as st
 import pandas as pd
 import os
-from datetime import datetime
-# --- Import untuk Google Sheets ---
-import gspread
-from google.oauth2.service_account import Credentials
-from io import BytesIO
-
-# --- Konfigurasi Awal ---
-
-# --- Konfigurasi Google Sheets (Ambil dari secrets.toml) ---
-GSHEET_URL = "" 
-GSHEET_WORKSHEET_NAME = ""
-
-# FIX: Mengganti "connections.gsheets" dengan "gsheets_connection"
-try:
-    GSHEET_URL = st.secrets["gsheets_connection"]["spreadsheet"]
-    GSHEET_WORKSHEET_NAME = st.secrets["gsheets_connection"]["worksheet"]
-except KeyError:
-    st.error("❌ ERROR: Kunci 'gsheets_connection' tidak ditemukan di file secrets.toml.")
-    st.stop()
-    
+from datetime import date, datetime, timedelta
+from data_access import current_data_version, load_dataset, load_facet_index, load_monthly_aggregates, load_search_key, prewarm_modules
+from search_index import MIN_SEARCH_LENGTH, MONTH_ORDER, search_mask
+from paginated_table import paginated_dataframe
+from export import XLSX_MIME, export_reader
+import instrumentation
+
+instrumentation.begin_rerun("Rekap")
 
 st.set_page_config(page_title="Rekap Data Surat Jalan", layout="wide")
 st.title("📊 Rekap Data Surat Jalan")
@@ -28,138 +16,72 @@ st.markdown("Filter, cari, dan unduh data Delivery Order (DO) di sini.")
 st.markdown("---")
 
 
-# --- Fungsi Helper Koneksi GSheets ---
-@st.cache_resource
-def get_gspread_client():
-    try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        
-        # FIX: Mengecek apakah gcp_service_account ada
-        if "gcp_service_account" not in st.secrets:
-             st.error("❌ ERROR: Kunci 'gcp_service_account' tidak ditemukan di file secrets.toml.")
-             return None
-             
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=scopes
-        )
-        return gspread.authorize(creds)
-    except Exception as e:
-        st.error(f"❌ ERROR saat menginisialisasi Google Service Account. Pastikan kunci 'gcp_service_account' sudah benar. Detail: {e}")
-        return None
-
-GSHEET_CLIENT = get_gspread_client()
-
-# FIX (sebelumnya): Tambahkan underscore (_) di depan 'client'
-@st.cache_resource 
-def get_worksheet(_client, url, sheet_name):
-    """Membuka Google Sheet dan Worksheet."""
-    if _client is None: return None
-    try:
-        sh = _client.open_by_url(url) # Gunakan _client di sini
-        return sh.worksheet(sheet_name)
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"❌ Worksheet '{sheet_name}' tidak ditemukan. Cek nama Worksheet di GSheet.")
-        return None
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error(f"❌ Spreadsheet tidak ditemukan di URL ini: {url}. Cek URL.")
-        return None
-    except Exception as e:
-        st.error(f"❌ ERROR saat memuat worksheet: {e}. PASTIKAN Anda sudah 'Share' Google Sheet ke email Service Account (sebagai Editor).")
-        return None
-
-# FIX (sebelumnya): Ubah pemanggilan fungsi agar sesuai dengan nama argumen baru
-GSHEET_WS = get_worksheet(_client=GSHEET_CLIENT, url=GSHEET_URL, sheet_name=GSHEET_WORKSHEET_NAME) 
-
-# --- Fungsi Helper Load Data ---
-# FIX UTAMA: Tambahkan underscore (_) di depan 'worksheet'
-@st.cache_data(ttl=600)
-def load_data(_worksheet):
-    """Memuat data dari Google Sheets dengan caching."""
-    if _worksheet is None: # <-- Gunakan _worksheet
-        return pd.DataFrame()
-        
-    try:
-        # Mengambil data dari Google Sheets
-        data = _worksheet.get_all_records() # <-- Gunakan _worksheet
-        df = pd.DataFrame(data)
-        
-        if df.empty or df.columns.empty:
-            return pd.DataFrame()
-            
-        # Pastikan kolom 'Date' dan 'Tgl PO' adalah tipe datetime dan 'Qty' numeric
-        # Menggunakan errors='coerce' untuk data yang rusak
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df['Tgl PO'] = pd.to_datetime(df['Tgl PO'], errors='coerce')
-        df['Qty'] = pd.to_numeric(df['Qty'], errors='coerce')
-        
-        return df
-    except Exception as e:
-        st.error(f"❌ Gagal membaca Google Sheet. Pastikan kolom-kolom tanggal dan Qty tidak rusak. Error: {e}")
-        return pd.DataFrame()
-
-# FIX UTAMA: Ubah pemanggilan fungsi agar sesuai dengan nama argumen baru
-df = load_data(_worksheet=GSHEET_WS)
-
-# --- Fungsi Helper Download ---
-def to_excel(df):
-    """Mengubah DataFrame ke format Excel dalam memory."""
-    output = BytesIO()
-    df_clean = df.copy()
-    
-    # Format tanggal ke string agar Excel membacanya dengan benar
-    if 'Date' in df_clean.columns:
-        df_clean['Date'] = df_clean['Date'].dt.strftime('%Y-%m-%d')
-    if 'Tgl PO' in df_clean.columns:
-        df_clean['Tgl PO'] = df_clean['Tgl PO'].dt.strftime('%Y-%m-%d')
-        
-    df_clean.to_excel(output, index=False, sheet_name='Data Rekap')
-    processed_data = output.getvalue()
-    return processed_data
+# --- Load Data (hanya rentang tanggal terpilih, difilter langsung di database) ---
+
+def default_date_range():
+    """Awal bulan lalu s/d akhir bulan ini."""
+    first_this_month = date.today().replace(day=1)
+    first_prev_month = (first_this_month - timedelta(days=1)).replace(day=1)
+    last_this_month = (first_this_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return first_prev_month, last_this_month
+
+st.sidebar.header("Opsi Filter Data")
+all_dates = st.sidebar.toggle("Semua tanggal (termasuk DO tanpa tanggal)", key="rekap_all_dates")
+date_range = None
+if not all_dates:
+    picked_dates = st.sidebar.date_input(
+        "Rentang Tanggal DO", value=default_date_range(), format="DD/MM/YYYY", key="rekap_date_range"
+    )
+    # Saat baru satu tanggal yang dipilih, rentang = hari itu saja
+    picked_dates = tuple(picked_dates) or default_date_range()
+    date_range = (picked_dates[0].isoformat(), picked_dates[-1].isoformat())
+
+data_version = current_data_version()
+df = load_dataset(data_version, date_range)
 
 if df.empty:
-    st.warning("⚠️ Belum ada data surat jalan tersimpan di Google Sheets, atau koneksi GSheet gagal. Cek pesan error di atas.")
+    if date_range is not None:
+        st.warning("⚠️ Tidak ada surat jalan pada rentang tanggal ini. Ubah rentang tanggal atau aktifkan 'Semua tanggal' di sidebar.")
+    else:
+        st.warning("⚠️ Belum ada data surat jalan tersimpan di database, atau koneksi GSheet gagal. Cek pesan error di atas.")
 else:
     # --- 1. Sidebar untuk Filter ---
-    st.sidebar.header("Opsi Filter Data")
-    
-    # Filter Tahun
-    df_temp = df.copy()
-    # Hapus baris yang Date-nya NaT (Not a Time) untuk menghindari error tahun
-    df_temp.dropna(subset=['Date'], inplace=True) 
-    
-    if not df_temp.empty:
-        df_temp['Year'] = df_temp['Date'].dt.year
-        unique_years = sorted(df_temp['Year'].unique().tolist(), reverse=True)
-    else:
-        unique_years = []
-    
-    selected_years = st.sidebar.multiselect("Pilih Tahun (berdasarkan 'Date' DO)", unique_years, default=unique_years)
-
-    # Filter Transportir
-    transportir_options = sorted(df['Transportir'].dropna().unique().tolist())
-    selected_transportir = st.sidebar.multiselect("Pilih Transportir", transportir_options, default=transportir_options)
+    # Facet index dibangun sekali per versi data + rentang tanggal: filter hanya menggabungkan mask, tanpa salinan DataFrame
+    facets = load_facet_index(data_version, date_range)
+
+    # (facet, label, key widget, semua opsi terpilih di awal?, pilihan kosong = tanpa filter?)
+    FACET_FILTERS = [
+        ("Year", "Pilih Tahun (berdasarkan 'Date' DO)", "rekap_year", True, True),
+        ("Month", "Pilih Bulan (kosong = semua)", "rekap_month", False, True),
+        ("Transportir", "Pilih Transportir", "rekap_transportir", True, False),
+        ("Jenis BBM", "Pilih Jenis BBM", "rekap_bbm", True, False),
+        ("Client", "Pilih Client (kosong = semua)", "rekap_client", False, True),
+    ]
 
-    # Filter Jenis BBM
-    bbm_options = sorted(df['Jenis BBM'].dropna().unique().tolist())
-    selected_bbm = st.sidebar.multiselect("Pilih Jenis BBM", bbm_options, default=bbm_options)
+    def facet_selections():
+        """Pilihan filter saat ini (dari session_state) dalam format FacetIndex.mask."""
+        selections = {}
+        for facet, _, key, select_all, empty_means_all in FACET_FILTERS:
+            chosen = st.session_state.get(key, facets.options(facet) if select_all else [])
+            if chosen or not empty_means_all:
+                selections[facet] = chosen
+        return selections
+
+    for facet, label, key, select_all, _ in FACET_FILTERS:
+        # Jumlah per opsi mengikuti filter facet lain yang sedang aktif
+        option_counts = facets.counts(facet, facet_selections())
+        empty_label = "(tanpa tanggal)" if facet == "Year" else "(kosong)"
+        st.sidebar.multiselect(
+            label,
+            facets.options(facet),
+            default=facets.options(facet) if select_all else [],
+            format_func=lambda value, counts=option_counts, empty_label=empty_label: f"{value if value != '' else empty_label} ({counts.get(value, 0)})",
+            key=key
+        )
 
     # Terapkan Filter
-    df_filtered = df.copy()
-    
-    # Filter Transportir dan Jenis BBM
-    df_filtered = df_filtered[
-        df_filtered['Transportir'].isin(selected_transportir) &
-        df_filtered['Jenis BBM'].isin(selected_bbm)
-    ]
-    
-    # Filter Tahun (Hanya baris dengan Date yang valid)
-    df_filtered['Year'] = df_filtered['Date'].dt.year
-    if selected_years and 'Year' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['Year'].isin(selected_years)]
-    
-    # Hapus kolom sementara 'Year'
-    df_filtered = df_filtered.drop(columns=['Year'], errors='ignore')
+    with instrumentation.span("rekap.filter"):
+        df_filtered = df[facets.mask(facet_selections())]
 
     st.markdown("---")
     
@@ -167,26 +89,24 @@ else:
     st.subheader("Hasil Filter Data")
     
     # Pencarian cepat
-    search_term = st.text_input("Cari berdasarkan NOMOR DO, Client, atau Driver (Minimal 3 karakter)", "")
+    search_term = st.text_input(
+        f"Cari berdasarkan NOMOR DO, Client, Driver, PO, Nopol, atau Alamat (Minimal {MIN_SEARCH_LENGTH} karakter)", ""
+    )
     
-    if search_term and len(search_term) >= 3:
-        search_term_lower = search_term.lower()
-        df_filtered = df_filtered[
-            df_filtered.apply(lambda row: 
-                search_term_lower in str(row['NOMOR DO']).lower() or
-                search_term_lower in str(row['Client']).lower() or
-                search_term_lower in str(row['Nama Driver']).lower(), 
-                axis=1
-            )
-        ]
+    if search_term and len(search_term.strip()) >= MIN_SEARCH_LENGTH:
+        # Kunci pencarian dibangun sekali per versi data; di sini hanya satu str.contains vektor
+        search_key = load_search_key(data_version, date_range).loc[df_filtered.index]
+        with instrumentation.span("rekap.search"):
+            df_filtered = df_filtered[search_mask(search_key, search_term)]
     
     if df_filtered.empty:
         st.warning("Data tidak ditemukan dengan kriteria filter yang dipilih.")
         st.stop()
 
     # Tampilkan table interaktif
-    st.dataframe(
-        df_filtered.reset_index(drop=True),
+    paginated_dataframe(
+        df_filtered,
+        key="rekap_table",
         use_container_width=True,
         # Mengatur beberapa kolom agar tampilan lebih rapi
         column_config={
@@ -219,12 +139,57 @@ else:
             value=f"{len(df_filtered)}"
         )
         
-    # Download Button
+    # Download Button: file Excel baru dibuat saat tombol diklik, lalu di-cache per versi data + filter
     with col_download:
-        excel_data = to_excel(df_filtered)
+        export_filters = {"dates": date_range, "facets": facet_selections(), "search": search_term.strip().lower()}
         st.download_button(
             label="⬇️ Download Data Rekap (Excel)",
-            data=excel_data,
+            data=export_reader(df_filtered, "xlsx", data_version, export_filters, sheet_name='Data Rekap'),
             file_name=f"rekap_do_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mime=XLSX_MIME
         )
+
+    # --- 4. Rekap Bulanan (dari cube agregat) ---
+    st.markdown("---")
+    st.subheader("Rekap Bulanan")
+    st.caption(
+        "Dihitung dari agregat bulanan yang diperbarui setiap kali DO disimpan/dihapus (tidak membaca ulang seluruh baris). "
+        "Bulan berdasarkan 'Date' DO; mengikuti filter di sidebar (bulan yang beririsan dengan rentang tanggal dihitung penuh), "
+        "tanpa pencarian cepat."
+    )
+
+    cube = load_monthly_aggregates(data_version)
+    cube_mask = pd.Series(True, index=cube.index)
+    if date_range is not None:
+        cube_mask &= cube["Bulan"].between(date_range[0][:7], date_range[1][:7])
+    for facet, selected in facet_selections().items():
+        if facet == "Year":
+            # Bulan "" = DO tanpa tanggal, ikut jika opsi "(tanpa tanggal)" dipilih
+            cube_mask &= cube["Bulan"].str[:4].isin([str(year) for year in selected])
+        elif facet == "Month":
+            month_numbers = [f"{MONTH_ORDER.index(m) + 1:02d}" for m in selected if m in MONTH_ORDER]
+            cube_mask &= cube["Bulan"].str[5:7].isin(month_numbers)
+        else:
+            cube_mask &= cube[facet].isin([str(value) for value in selected])
+    cube = cube[cube_mask].replace({"Bulan": {"": "(tanpa tanggal)"}})
+
+    if cube.empty:
+        st.info("Tidak ada data bulanan untuk filter yang dipilih.")
+    else:
+        col_pivot_by, col_pivot_value = st.columns(2)
+        pivot_by = col_pivot_by.radio("Rinci per", ["Transportir", "Jenis BBM", "Client"], horizontal=True, key="rekap_pivot_by")
+        pivot_value = col_pivot_value.radio("Nilai", ["Qty", "Jumlah DO"], horizontal=True, key="rekap_pivot_value")
+
+        pivot = cube.pivot_table(index="Bulan", columns=pivot_by, values=pivot_value, aggfunc="sum", fill_value=0)
+        pivot["TOTAL"] = pivot.sum(axis=1)
+        st.dataframe(pivot, use_container_width=True)
+
+        # Grafik: 10 nilai terbesar, sisanya digabung agar legenda tetap terbaca
+        chart_data = pivot.drop(columns="TOTAL")
+        if chart_data.shape[1] > 10:
+            top_columns = chart_data.sum().nlargest(10).index
+            chart_data = chart_data[top_columns].assign(Lainnya=chart_data.drop(columns=top_columns).sum(axis=1))
+        st.bar_chart(chart_data)
+
+    # openpyxl (tombol Download Excel) dimuat di background setelah halaman tampil
+    prewarm_modules("openpyxl")
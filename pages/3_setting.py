@@ -4,10 +4,11 @@ import os
 import shutil
 from datetime import datetime
 import json
-from io import BytesIO
-# --- Import untuk Google Sheets ---
-import gspread
-from google.oauth2.service_account import Credentials
+from data_access import current_data_version, load_dataset, prewarm_modules
+from export import CSV_MIME, XLSX_MIME, export_reader
+import instrumentation
+
+instrumentation.begin_rerun("Pengaturan")
 
 
 # --- 1. Konfigurasi Path ---
@@ -16,57 +17,6 @@ ASSETS_FOLDER = "assets"
 os.makedirs(ASSETS_FOLDER, exist_ok=True) 
 
 
-# --- Konfigurasi Google Sheets (Ambil dari secrets.toml) ---
-GSHEET_URL = "" 
-GSHEET_WORKSHEET_NAME = ""
-
-# FIX: Mengganti "connections.gsheets" dengan "gsheets_connection"
-try:
-    GSHEET_URL = st.secrets["gsheets_connection"]["spreadsheet"]
-    GSHEET_WORKSHEET_NAME = st.secrets["gsheets_connection"]["worksheet"]
-except KeyError:
-    st.error("❌ ERROR: Kunci 'gsheets_connection' tidak ditemukan di file secrets.toml.")
-    st.stop()
-    
-
-# --- Fungsi Helper Koneksi GSheets ---
-@st.cache_resource
-def get_gspread_client():
-    try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        
-        # FIX: Mengecek apakah gcp_service_account ada
-        if "gcp_service_account" not in st.secrets:
-             st.error("❌ ERROR: Kunci 'gcp_service_account' tidak ditemukan di file secrets.toml.")
-             return None
-             
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=scopes
-        )
-        return gspread.authorize(creds)
-    except Exception as e:
-        st.error(f"❌ ERROR saat menginisialisasi Google Service Account. Detail: {e}")
-        return None
-
-GSHEET_CLIENT = get_gspread_client()
-
-# FIX: Tambahkan underscore (_) di depan 'client' untuk caching
-@st.cache_resource 
-def get_worksheet(_client, url, sheet_name):
-    """Membuka Google Sheet dan Worksheet."""
-    if _client is None: return None
-    try:
-        sh = _client.open_by_url(url) # Gunakan _client
-        return sh.worksheet(sheet_name)
-    except Exception as e:
-        # Menangani kesalahan saat memuat worksheet
-        st.warning(f"⚠️ Gagal memuat worksheet. Pastikan URL, nama sheet, dan izin sudah benar. Error: {e}")
-        return None
-
-# FIX: Ubah pemanggilan fungsi agar sesuai dengan nama argumen baru
-GSHEET_WS = get_worksheet(_client=GSHEET_CLIENT, url=GSHEET_URL, sheet_name=GSHEET_WORKSHEET_NAME) 
-
 # --- 2. Fungsi Helper (TETAP SAMA) ---
 
 def load_config():
@@ -150,52 +100,32 @@ st.divider()
 # =================================================================
 st.header("3. Opsi Sistem")
 
-# FIX: Tambahkan underscore (_) di depan 'worksheet' untuk caching
-@st.cache_data(ttl=600)
-def load_data_for_download(_worksheet):
-    """Memuat semua data dari GSheets untuk diunduh."""
-    if _worksheet is None: # Gunakan _worksheet
-        return pd.DataFrame()
-    try:
-        data = _worksheet.get_all_records() # Gunakan _worksheet
-        return pd.DataFrame(data)
-    except Exception:
-        return pd.DataFrame()
-
-
-# FIX: Ubah pemanggilan fungsi agar sesuai dengan nama argumen baru
-df_download = load_data_for_download(_worksheet=GSHEET_WS)
+data_version = current_data_version()
+df_download = load_dataset(data_version)
 
-st.info("Database Anda sekarang menggunakan Google Sheets. Google secara otomatis melakukan backup. Anda dapat mengunduh salinan data di sini.")
+st.info("Database Anda disimpan di database lokal dan disalin otomatis ke Google Sheets. Anda dapat mengunduh salinan data di sini.")
 
 if not df_download.empty:
-    # Unduh data dalam format CSV
-    csv = df_download.to_csv(index=False).encode('utf-8')
+    # File ekspor baru dibuat saat tombol diklik (bukan setiap rerun) dan di-cache per versi data
     st.download_button(
         label="⬇️ Unduh Salinan Database (CSV)",
-        data=csv,
+        data=export_reader(df_download, "csv", data_version),
         file_name=f"dbase_backup_{datetime.now().strftime('%Y%m%d')}.csv",
-        mime='text/csv',
-        help="Mengunduh salinan data dari Google Sheets dalam format CSV."
+        mime=CSV_MIME,
+        help="Mengunduh salinan data dalam format CSV."
     )
     
-    # Unduh data dalam format Excel (Optional)
-    # Catatan: Fungsi to_excel_download tidak menerima objek gspread, jadi tidak perlu underscore
-    @st.cache_data
-    def to_excel_download(df):
-        output = BytesIO()
-        df.to_excel(output, index=False, sheet_name='Data Backup')
-        return output.getvalue()
-        
-    excel_data = to_excel_download(df_download)
     st.download_button(
         label="⬇️ Unduh Salinan Database (Excel)",
-        data=excel_data,
+        data=export_reader(df_download, "xlsx", data_version, sheet_name='Data Backup'),
         file_name=f"dbase_backup_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        mime=XLSX_MIME
     )
 
 else:
-    st.warning("Database Google Sheets kosong atau gagal dimuat.")
+    st.warning("Database kosong atau gagal dimuat.")
 
 st.divider()
+
+# openpyxl (tombol Unduh Excel) dimuat di background setelah halaman tampil
+prewarm_modules("openpyxl")
@@ -0,0 +1,88 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import instrumentation
+from data_access import get_storage
+
+st.set_page_config(page_title="Diagnostik", layout="wide")
+st.title("🩺 Diagnostik Kinerja")
+st.markdown(
+    "Durasi langkah-langkah utama (panggilan Google Sheets, cache, parsing, PDF, ekspor) "
+    "yang dicatat di proses aplikasi ini sejak start / reset terakhir."
+)
+
+
+# --- Helper Tampilan ---
+
+def span_table(spans):
+    df = pd.DataFrame(spans, columns=["span", "count", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_s"])
+    return df.rename(columns={
+        "span": "Langkah", "count": "Jumlah", "errors": "Error",
+        "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)", "p99_ms": "p99 (ms)", "max_ms": "Maks (ms)", "total_s": "Total (detik)",
+    })
+
+def cache_table(counters):
+    rows = {}
+    for name, value in counters.items():
+        if name.startswith("cache.") and name.rsplit(".", 1)[-1] in ("hit", "miss"):
+            cache_name, outcome = name[len("cache."):].rsplit(".", 1)
+            rows.setdefault(cache_name, {"Cache": cache_name, "Hit": 0, "Miss": 0})[outcome.capitalize()] = value
+    df = pd.DataFrame(list(rows.values()), columns=["Cache", "Hit", "Miss"])
+    total = df["Hit"] + df["Miss"]
+    df["Hit rate"] = (df["Hit"] / total.where(total > 0)).map(lambda r: f"{r:.0%}" if pd.notna(r) else "-")
+    return df
+
+
+# --- Tampilan ---
+
+col_refresh, col_reset = st.columns([3, 1])
+auto_refresh = col_refresh.toggle("Perbarui otomatis setiap 5 detik", value=False)
+if col_reset.button("Reset Statistik"):
+    instrumentation.reset()
+    st.toast("Statistik direset.")
+
+@st.fragment(run_every=5 if auto_refresh else None)
+def render_diagnostics():
+    data = instrumentation.snapshot()
+    st.caption(
+        f"Dicatat sejak {datetime.fromtimestamp(data['since']).strftime('%d-%m-%Y %H:%M:%S')} · "
+        f"diperbarui {datetime.now().strftime('%H:%M:%S')}"
+    )
+
+    storage = get_storage()
+    sheets_spans = [s for s in data["spans"] if s["span"].startswith(instrumentation.SHEETS_PREFIX)]
+    col_calls, col_time, col_queue, col_sync = st.columns(4)
+    col_calls.metric("Panggilan Google Sheets", f"{sum(s['count'] for s in sheets_spans):,}")
+    col_time.metric("Waktu di Google Sheets", f"{sum(s['total_s'] for s in sheets_spans):,.1f} detik")
+    col_queue.metric("Antrian Sinkronisasi", f"{storage.pending_count():,}")
+    col_sync.metric(
+        "Sinkron Terakhir",
+        datetime.fromtimestamp(storage.last_sync).strftime('%H:%M:%S') if storage.last_sync else "-"
+    )
+    if storage.last_error:
+        st.warning(f"Error sinkronisasi terakhir: {storage.last_error}")
+
+    st.subheader("Panggilan Google Sheets per Rerun")
+    st.caption("Hanya panggilan dari halaman itu sendiri; sinkronisasi di background tidak dihitung di sini.")
+    reruns = pd.DataFrame(list(reversed(data["reruns"])), columns=["started", "page", "sheets_calls"])
+    reruns["started"] = reruns["started"].map(lambda t: datetime.fromtimestamp(t).strftime('%H:%M:%S'))
+    st.dataframe(
+        reruns.rename(columns={"started": "Waktu", "page": "Halaman", "sheets_calls": "Panggilan Sheets"}),
+        use_container_width=True, hide_index=True, height=250
+    )
+
+    st.subheader("Cache")
+    st.dataframe(cache_table(data["counters"]), use_container_width=True, hide_index=True)
+    export_hits = data["counters"].get("export.cache.hit", 0)
+    export_misses = data["counters"].get("export.cache.miss", 0)
+    pdf_hits = data["counters"].get("pdf.cache.hit", 0)
+    pdf_misses = data["counters"].get("pdf.cache.miss", 0)
+    st.caption(f"Cache file ekspor: {export_hits} hit, {export_misses} miss · cache PDF: {pdf_hits} hit, {pdf_misses} miss.")
+
+    st.subheader("Durasi per Langkah")
+    st.dataframe(
+        span_table(data["spans"]).style.format(precision=2),
+        use_container_width=True, hide_index=True
+    )
+
+render_diagnostics()
@@ -0,0 +1,53 @@
+"""
+Tabel berhalaman untuk DataFrame besar.
+
+Hanya potongan halaman yang sedang dilihat yang dikirim ke browser, jadi ukuran data per
+rerun tetap kecil berapa pun jumlah DO. Ukuran halaman, kolom urut dan nomor halaman
+disimpan di st.session_state per tabel (berdasarkan key).
+"""
+import math
+
+import streamlit as st
+
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250]
+NO_SORT = "(urutan database)"
+
+
+def page_slice(df, page, page_size, sort_column=None, descending=False):
+    """Mengambil baris untuk satu halaman; pengurutan hanya pada satu kolom, bukan seluruh DataFrame."""
+    start = (page - 1) * page_size
+    if sort_column is None or sort_column not in df.columns:
+        return df.iloc[start:start + page_size]
+    order = df[sort_column].sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return df.loc[order[start:start + page_size]]
+
+
+def paginated_dataframe(df, key, default_sort=None, default_descending=False, **dataframe_kwargs):
+    """
+    Menampilkan df sebagai tabel berhalaman. dataframe_kwargs diteruskan ke st.dataframe
+    (column_config, height, dll.).
+    """
+    total_rows = len(df)
+    col_size, col_sort, col_desc, col_page = st.columns([1, 2, 1, 1])
+
+    page_size = col_size.selectbox("Baris per halaman", PAGE_SIZE_OPTIONS, index=1, key=f"{key}_page_size")
+    sort_options = [NO_SORT] + list(df.columns)
+    sort_index = sort_options.index(default_sort) if default_sort in sort_options else 0
+    sort_column = col_sort.selectbox("Urutkan berdasarkan", sort_options, index=sort_index, key=f"{key}_sort")
+    descending = col_desc.checkbox("Menurun", value=default_descending, key=f"{key}_desc")
+
+    total_pages = max(1, math.ceil(total_rows / page_size))
+    page_key = f"{key}_page"
+    # Data bisa menyusut (filter/hapus) sejak rerun sebelumnya: jaga nomor halaman tetap valid
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    page = col_page.number_input(
+        "Halaman", min_value=1, max_value=total_pages, step=1, key=page_key
+    )
+
+    visible = page_slice(df, int(page), page_size, None if sort_column == NO_SORT else sort_column, descending)
+    st.dataframe(visible, **dataframe_kwargs)
+
+    first_row = (int(page) - 1) * page_size + 1 if total_rows else 0
+    last_row = first_row + len(visible) - 1 if total_rows else 0
+    st.caption(f"Halaman {int(page)} dari {total_pages} · baris {first_row}–{last_row} dari {total_rows}.")
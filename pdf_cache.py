@@ -0,0 +1,162 @@
+"""
+Cache PDF Surat Jalan di disk (content-addressed, LRU dengan batas ukuran).
+
+Kunci cache = hash dari kolom DO yang dicetak + isi gambar header + isi konfigurasi identitas
++ kode pembuat PDF, jadi cetak ulang DO yang tidak berubah langsung mengambil file lama
+tanpa memuat ReportLab. Perubahan data/header/konfigurasi otomatis menghasilkan kunci baru;
+file lama tersingkir saat cache melewati MAX_PDF_CACHE_BYTES (yang paling lama tidak dipakai
+dihapus lebih dulu).
+
+Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga dari skrip/CLI.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from storage import normalize_row
+from surat_jalan_assets import CONFIG_PATH, find_header_image
+
+PDF_CACHE_DIR = "pdf_cache"
+MAX_PDF_CACHE_BYTES = 200 * 1024 * 1024
+# Satu thread: doc.build() memakai template bersama di bawah template.lock (dan ReportLab
+# terikat GIL), jadi worker kedua hanya menunggu lock tanpa membuat PDF lebih cepat
+RENDER_WORKERS = 1
+# Kolom yang dipakai build_pdf_sha; kolom lain (No, Month, Keterangan, ...) tidak mengubah PDF
+PDF_FIELDS = [
+    "NOMOR DO", "Date", "Client", "Site/Discharge Addr Line 1", "Site/Discharge Addr Line 2",
+    "PO Client", "Tgl PO", "PIC Delivery", "Qty", "Jenis BBM", "Transportir", "Fleet Number", "Nama Driver",
+]
+# Perubahan tata letak di kode pembuat PDF juga membatalkan cache
+RENDERER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf_surat_jalan.py")
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+# --- Kunci Cache ---
+
+@functools.lru_cache(maxsize=16)
+def _file_digest(path, mtime, size):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_digest(path):
+    """sha1 isi file (di-cache per mtime/ukuran); string kosong jika file tidak ada."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return ""
+    return _file_digest(path, stat.st_mtime, stat.st_size)
+
+def template_fingerprint():
+    """Sidik jari bagian statis PDF: gambar header, konfigurasi identitas dan kode pembuat PDF."""
+    return [file_digest(find_header_image()), file_digest(CONFIG_PATH), file_digest(RENDERER_SOURCE)]
+
+def pdf_cache_key(data_row):
+    """
+    Kunci cache untuk satu baris DO. Baris dari form (date, float) dan dari database
+    (Timestamp, teks) dengan isi yang sama menghasilkan kunci yang sama.
+    """
+    row = normalize_row(data_row)
+    values = []
+    for col in PDF_FIELDS:
+        value = row[col]
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        values.append(str(value))
+    payload = json.dumps([values, template_fingerprint()], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def pdf_cache_path(key):
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+
+# --- Baca / Tulis ---
+
+def cached_pdf(data_row):
+    """Isi PDF dari cache, atau None jika belum pernah dibuat untuk isi baris ini."""
+    path = pdf_cache_path(pdf_cache_key(data_row))
+    try:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+    except OSError:
+        instrumentation.count("pdf.cache.miss")
+        return None
+    # mtime = waktu terakhir dipakai (dasar LRU)
+    os.utime(path)
+    instrumentation.count("pdf.cache.hit")
+    return pdf_bytes
+
+def store_pdf(data_row, pdf_bytes):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    path = pdf_cache_path(pdf_cache_key(data_row))
+    # Tulis ke file sementara lalu rename: pembaca lain tidak pernah melihat file setengah jadi
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_pdf_cache()
+
+def prune_pdf_cache(max_bytes=MAX_PDF_CACHE_BYTES):
+    """Menghapus PDF yang paling lama tidak dipakai sampai total ukuran cache <= max_bytes."""
+    try:
+        entries = [e for e in os.scandir(PDF_CACHE_DIR) if e.name.endswith(".pdf")]
+    except OSError:
+        return
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def render_pdf(data_row):
+    """PDF Surat Jalan (bytes) untuk data_row: dari cache jika ada, selain itu dibuat lalu disimpan."""
+    pdf_bytes = cached_pdf(data_row)
+    if pdf_bytes is None:
+        # ReportLab hanya dimuat saat PDF benar-benar harus dibuat
+        from pdf_surat_jalan import build_pdf_sha
+        pdf_bytes = build_pdf_sha(data_row).getvalue()
+        store_pdf(data_row, pdf_bytes)
+    return pdf_bytes
+
+def submit_render(data_row):
+    """
+    Menjadwalkan render_pdf di thread background; mengembalikan Future berisi bytes PDF.
+    Thread (bukan proses) agar template ReportLab yang sudah dibangun dipakai bersama; simpan DO
+    di thread halaman sebagian besar menunggu I/O SQLite, jadi keduanya berjalan bersamaan.
+    Render sendiri berjalan satu per satu (RENDER_WORKERS = 1); cetak massal paralel memakai
+    proses (pdf_surat_jalan.build_pdf_batch).
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="pdf-render")
+    return _render_pool.submit(render_pdf, dict(data_row))
+
+def pdf_reader(data_row):
+    """Callable untuk st.download_button(data=...): PDF baru diambil/dibuat saat tombol diklik."""
+    data_row = dict(data_row)
+    return lambda: render_pdf(data_row)
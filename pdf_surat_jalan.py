@@ -0,0 +1,487 @@
+"""
+Pembuat PDF Surat Jalan (Fuel Order Delivery) dengan ReportLab.
+
+Dipisah dari halaman Streamlit agar bisa dipakai ulang oleh proses worker
+(cetak massal) dan skrip lain.
+"""
+import copy
+import functools
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus.flowables import Flowable
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm, mm
+
+import instrumentation
+from surat_jalan_assets import CONFIG_PATH, find_header_image, safe_pdf_filename
+
+# -------------------------------------------------------------
+# --- GLOBAL REPORTLAB STYLES (Diinisialisasi sekali) ---
+# -------------------------------------------------------------
+RL_STYLES = getSampleStyleSheet()
+
+RL_STYLES.add(ParagraphStyle(name='NormalSmallCustom', parent=RL_STYLES['Normal'], fontSize=9, leading=11)) 
+RL_STYLES.add(ParagraphStyle(name='BoldSmallCustom', parent=RL_STYLES['Normal'], fontSize=9, leading=11, fontName='Helvetica-Bold')) 
+RL_STYLES.add(ParagraphStyle(name='HeaderTitleCustom', parent=RL_STYLES['Normal'], fontSize=16, alignment=1, spaceAfter=2, fontName='Helvetica-Bold'))
+RL_STYLES.add(ParagraphStyle(name='FooterCenterCustom', parent=RL_STYLES['Normal'], fontSize=9, leading=11, alignment=1))
+RL_STYLES.add(ParagraphStyle(name='CenterAlignSmallCustom', parent=RL_STYLES['Normal'], fontSize=9, leading=11, alignment=1))
+RL_STYLES.add(ParagraphStyle(name='BeritaAcaraTitleCustom', parent=RL_STYLES['Normal'], fontSize=10, leading=12, alignment=1, fontName='Helvetica-Bold'))
+
+# -------------------------------------------------------------
+
+
+# --- Template Surat Jalan (Bagian Statis, Dibangun Sekali) ---
+
+# Layout & Style Settings
+LEBAR_PENUH_KOP = 20.8 * cm
+LEBAR_KONTEN_TENGAH = 19.0 * cm
+LEBAR_KOLOM_KIRI = 9.0 * cm
+LEBAR_KOLOM_KANAN = 10.0 * cm
+SPACER_WIDTH = (LEBAR_PENUH_KOP - LEBAR_KONTEN_TENGAH) / 2
+
+
+def center_table(flowable):
+    """Membungkus flowable di tengah halaman (kolom spacer kiri/kanan)."""
+    return Table(
+        [[Spacer(1, 1), flowable, Spacer(1, 1)]],
+        colWidths=[SPACER_WIDTH, LEBAR_KONTEN_TENGAH, SPACER_WIDTH]
+    )
+
+
+class PrecompiledImage(Flowable):
+    """
+    Gambar header yang di-encode sekali menjadi PDF image XObject lalu dipakai ulang
+    di setiap PDF. RLImage biasa membaca dan meng-encode ulang file gambar (ASCII85)
+    pada setiap doc.build(), yang merupakan bagian paling lambat dari pembuatan PDF.
+
+    Memakai atribut internal Canvas ReportLab; jika atribut itu tidak ada (versi ReportLab
+    lain), gambar digambar biasa dengan canvas.drawImage.
+    """
+
+    CANVAS_ATTRS = ("_doc", "_setXObjects", "_code", "_formsinuse")
+    DOC_ATTRS = ("getXObjectName", "idToObject", "Reference", "addForm")
+
+    def __init__(self, path, width, height):
+        Flowable.__init__(self)
+        self.path = path
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = 'CENTER'
+        self.name = f"header_{os.path.basename(path)}_{os.path.getmtime(path)}"
+        self.xobject = PDFImageXObject(self.name, path)
+        self.smask = self.xobject.__dict__.pop("_smask", None)
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def can_reuse_xobject(self, canvas):
+        return (
+            all(hasattr(canvas, attr) for attr in self.CANVAS_ATTRS)
+            and all(hasattr(canvas._doc, attr) for attr in self.DOC_ATTRS)
+        )
+
+    def draw(self):
+        canvas = self.canv
+        if not self.can_reuse_xobject(canvas):
+            canvas.drawImage(self.path, 0, 0, self.drawWidth, self.drawHeight, mask="auto")
+            return
+
+        # Mengikuti langkah registrasi XObject di Canvas.drawImage, tetapi memakai objek yang sudah jadi
+        pdf_doc = canvas._doc
+        reg_name = pdf_doc.getXObjectName(self.name)
+        if not pdf_doc.idToObject.get(reg_name):
+            # Registrasi menandai objeknya, jadi setiap dokumen memakai salinan dangkal
+            # (isi stream gambar yang sudah di-encode tetap dipakai bersama)
+            xobject = copy.copy(self.xobject)
+            canvas._setXObjects(xobject)
+            pdf_doc.Reference(xobject, reg_name)
+            pdf_doc.addForm(self.name, xobject)
+            if self.smask is not None:
+                smask = copy.copy(self.smask)
+                canvas._setXObjects(smask)
+                xobject.smask = pdf_doc.Reference(smask, pdf_doc.getXObjectName(smask.name))
+
+        canvas._currentPageHasImages = 1
+        canvas.saveState()
+        canvas.scale(self.drawWidth, self.drawHeight)
+        canvas._code.append(f"/{reg_name} Do")
+        canvas.restoreState()
+        canvas._formsinuse.append(self.name)
+
+
+class SuratJalanTemplate:
+    """
+    Bagian statis Surat Jalan: header, judul, Berita Acara, catatan, footer dan tabel TTD,
+    beserta TableStyle untuk bagian yang berisi data DO. Flowable statis dipakai ulang di
+    setiap PDF, jadi doc.build() dijalankan di bawah lock.
+    """
+
+    def __init__(self, header_path, company_name):
+        self.lock = threading.Lock()
+        styles = RL_STYLES
+
+        # --- Header Gambar ---
+        if header_path:
+            self.header = [PrecompiledImage(header_path, LEBAR_PENUH_KOP, 3.5 * cm), Spacer(1, 2 * mm)]
+        else:
+            self.header = [
+                Paragraph(f"<b>{company_name}</b> [Masukkan file 'sha.jpg' di folder assets]", styles['NormalSmallCustom']),
+                Spacer(1, 8 * mm)
+            ]
+
+        # --- Judul ---
+        self.title = [
+            center_table(Paragraph("<u>FUEL ORDER DELIVERY</u>", styles['HeaderTitleCustom'])),
+            Spacer(1, 5 * mm)
+        ]
+
+        # --- Style Info DO & Tabel Kuantitas ---
+        self.info_kiri_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1 * mm)
+        ])
+        self.info_kanan_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+            ('FONTSIZE', (0,0), (-1,-1), 9), 
+            ('ALIGN', (0,0), (0,-1), 'RIGHT'), 
+            ('ALIGN', (1,0), (1,-1), 'CENTER'), 
+            ('ALIGN', (2,0), (2,-1), 'LEFT'),  
+            ('LEFTPADDING', (0,0), (-1,-1), 0), ('RIGHTPADDING', (0,0), (-1,-1), 0), 
+            ('BOTTOMPADDING', (0,0), (-1,-1), 1*mm), 
+        ])
+        self.info_gabungan_style = TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')])
+        self.info_kanan_labels = [
+            Paragraph(label, styles['NormalSmallCustom'])
+            for label in ["Date", "Ship To", "Site", "NO PO", "Tgl PO", "CP"]
+        ]
+        self.items_style = TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.black), ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('ALIGN', (0,0), (0,-1), 'CENTER'),
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'), ('FONTSIZE', (0,0), (-1,-1), 9), 
+            ('ALIGN', (1,1), (1,1), 'CENTER'), 
+            ('ALIGN', (2,1), (2,1), 'CENTER'), 
+        ])
+
+        # --- BERITA ACARA PENERIMAAN BBM / FUEL (Layout Final) ---
+        
+        # Header Berita Acara (Menggabungkan 4 kolom)
+        header_ba_data = [
+            [Paragraph("BERITA ACARA PENERIMAAN BBM / FUEL", styles['Normal'])],
+            [Paragraph("Barang / BBM Solar telah di terima dan telah di periksa sebagaimana berikut :", styles['BeritaAcaraTitleCustom'])]
+        ]
+        header_ba_table = Table(header_ba_data, colWidths=[LEBAR_KONTEN_TENGAH]) 
+        header_ba_table.setStyle(TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 10),
+        ]))
+        self.berita_acara_header = center_table(header_ba_table)
+
+        # Baris penerimaan; hanya baris 2 (Volume dikirim) yang berisi data DO
+        center_small = styles['CenterAlignSmallCustom']
+        self.penerimaan_rows = [
+            # Baris 1: Mutu Barang
+            [
+                Paragraph("1", center_small), 
+                "Mutu Barang / Kualitas BBM Solar", 
+                Paragraph("a. Baik", center_small), 
+                Paragraph("b. Buruk", center_small)
+            ], 
+            # Baris 2: Volume (kolom 2 diisi per DO)
+            [
+                Paragraph("2", center_small), 
+                None, 
+                Paragraph("Volume diterima :", styles['NormalSmallCustom']), 
+                Paragraph("............... Liter", styles['NormalSmallCustom']),
+            ], 
+            # Baris 3: Segel Atas
+            [
+                Paragraph("3", center_small), 
+                "Segel Atas No. ..........................", 
+                Paragraph("a. Baik", center_small), 
+                Paragraph("b. Rusak/ Terputus", center_small)
+            ], 
+            # Baris 4: Segel Bawah
+            [
+                Paragraph("4", center_small), 
+                "Segel Bawah No. .......................", 
+                Paragraph("a. Baik", center_small), 
+                Paragraph("b. Rusak/ Terputus", center_small)
+            ], 
+            # Baris 5: Ketinggian T2 - KOREKSI DATA UNTUK GABUNG KOLOM 3 & 4
+            [
+                Paragraph("5", center_small), 
+                "Ketinggian T2 (After Loading)", 
+                Paragraph("Tepat / Lebih / Kurang (____ cm ____ ml)", center_small), 
+                "", # Kolom kosong karena digabungkan oleh TableStyle
+            ], 
+        ]
+        self.penerimaan_style = TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.black), 
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica'), 
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            
+            # Kolom No.
+            ('ALIGN', (0,0), (0,-1), 'CENTER'), 
+
+            # Kolom Deskripsi Kiri (Mutu, Segel)
+            ('ALIGN', (1,0), (1,0), 'LEFT'), 
+            ('ALIGN', (1,2), (1,4), 'LEFT'), 
+            
+            # Kolom Volume dikirim (Rata Kiri)
+            ('ALIGN', (1,1), (1,1), 'LEFT'), 
+            
+            # Kolom Volume diterima (Label Rata Kanan, Nilai Rata Kiri)
+            ('ALIGN', (2,1), (2,1), 'RIGHT'), 
+            ('ALIGN', (3,1), (3,1), 'LEFT'),  
+            
+            # Kolom Opsi Centang (Rata Tengah)
+            ('ALIGN', (2,0), (2,0), 'CENTER'), ('ALIGN', (3,0), (3,0), 'CENTER'), # Mutu
+            ('ALIGN', (2,2), (2,3), 'CENTER'), ('ALIGN', (3,2), (3,3), 'CENTER'), # Segel
+            
+            # Ketinggian (Gabungkan Kolom 3 & 4, Rata Tengah)
+            ('SPAN', (2, 4), (3, 4)), 
+            ('ALIGN', (2, 4), (3, 4), 'CENTER'), 
+        ])
+
+        # --- Catatan, Peringatan & TTD Footer ---
+        ttd_data = [
+            ["Dikirim Oleh,", "", "Diterima Oleh,"],
+            ["TTD PENGANTAR", "", "TTD PENERIMA"],
+            ["", "", ""], 
+            ["", "", ""], 
+            ["Nama dan Tanggal", "", "Nama dan Tanggal"],
+        ]
+        ttd_table = Table(ttd_data, colWidths=[7.5*cm, 4.0*cm, 7.5*cm])
+        ttd_table.setStyle(TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'), ('ALIGN', (0,0), (0,-1), 'CENTER'),
+            ('ALIGN', (2,0), (2,-1), 'CENTER'), ('FONTNAME', (0,0), (-1,-1), 'Helvetica'),
+            ('FONTSIZE', (0,0), (-1,-1), 10), ('LINEBELOW', (0,4), (0,4), 0.5, colors.black),
+            ('LINEBELOW', (2,4), (2,4), 0.5, colors.black), ('ROWHEIGHT', (0,2), (0,3), 1*cm),
+        ]))
+
+        self.footer = [
+            Spacer(1, 3*mm),
+            center_table(Paragraph("<b>Coment/Catatan:</b>", styles['Normal'])),
+            Spacer(1, 15*mm),
+            center_table(Paragraph("BBM Solar Yang Sudah Diterima Dengan Baik Tidak Dapat Dikembalikan.", styles['FooterCenterCustom'])),
+            center_table(Paragraph("Tidak Menerima Keluhan Apabila BBM Solar Telah Diterima Dan Surat Jalan Telah Ditanda Tangani", styles['FooterCenterCustom'])),
+            Spacer(1, 5*mm),
+            center_table(ttd_table),
+        ]
+
+        # Ukur layout bagian statis sekali di awal
+        for flowable in self.header + self.title + [self.berita_acara_header] + self.footer:
+            flowable.wrap(LEBAR_PENUH_KOP, A4[1])
+
+
+def load_company_name():
+    """Membaca nama perusahaan dari file konfigurasi identitas (default PT. SHA SOLO)."""
+    try:
+        with open(CONFIG_PATH, 'r') as f:
+            return json.load(f).get("Nama Perusahaan") or "PT. SHA SOLO"
+    except Exception:
+        return "PT. SHA SOLO"
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+@functools.lru_cache(maxsize=4)
+def load_template(header_path, header_mtime, config_mtime):
+    """Membangun template; di-cache per (gambar header, mtime header, mtime konfigurasi)."""
+    return SuratJalanTemplate(header_path, load_company_name())
+
+def get_template():
+    """Mengembalikan template yang masih berlaku untuk gambar header dan konfigurasi saat ini."""
+    header_path = find_header_image()
+    return load_template(header_path, file_mtime(header_path) if header_path else None, file_mtime(CONFIG_PATH))
+
+
+# --- Fungsi Pembuat PDF (ReportLab) ---
+
+@instrumentation.timed("pdf.build_pdf_sha")
+def build_pdf_sha(data_row):
+    """Membuat PDF Surat Jalan dan mengembalikannya sebagai BytesIO buffer."""
+    buffer = io.BytesIO()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=0.1 * cm,
+        leftMargin=0.1 * cm,
+        topMargin=0.1 * cm,
+        bottomMargin=0.1 * cm
+    )
+
+    template = get_template()
+    styles = RL_STYLES
+
+    # --- Data Mapping (gunakan aman str) ---
+    def s(val):
+        return "" if val in [None, "nan", "NaT"] else str(val).strip()
+
+    do_num = s(data_row.get("NOMOR DO"))
+    attn = s(data_row.get("PIC Delivery"))
+    ship_to = s(data_row.get("Client"))
+    site_addr_1 = s(data_row.get("Site/Discharge Addr Line 1"))
+    site_addr_2 = s(data_row.get("Site/Discharge Addr Line 2"))
+    no_po = s(data_row.get("PO Client"))
+    jenis_bbm = s(data_row.get("Jenis BBM"))
+    transportir = s(data_row.get("Transportir"))
+    fleet_no = s(data_row.get("Fleet Number"))
+    driver = s(data_row.get("Nama Driver"))
+
+    qty_raw = data_row.get("Qty", 0.0)
+    qty = float(qty_raw) if pd.notna(qty_raw) else 0.0
+    qty_display = f"{qty:,.0f}".replace(",", ".")
+
+    # --- Format tanggal aman ---
+    def fmt_date(val):
+        try:
+            if isinstance(val, datetime):
+                return val.strftime("%Y-%m-%d")
+            return datetime.strptime(str(val), "%Y-%m-%d").strftime("%Y-%m-%d")
+        except Exception:
+            return s(val)
+
+    date_display = fmt_date(data_row.get("Date"))
+    tgl_po_display = fmt_date(data_row.get("Tgl PO"))
+
+    elements = template.header + template.title
+
+    # --- Info DO ---
+    info_kiri_data = [
+        ["DO #", Paragraph(f": <b>{do_num}</b>", styles['BoldSmallCustom'])],
+        ["To", ": PT. SHA Solo"],
+        ["Attn.", Paragraph(f": <b>{attn}</b>", styles['BoldSmallCustom'])]
+    ]
+    info_kiri_table = Table(info_kiri_data, colWidths=[1.5 * cm, 7.5 * cm])
+    info_kiri_table.setStyle(template.info_kiri_style)
+
+    site_gabungan = f"<b>{site_addr_1}</b><br/><b>{site_addr_2}</b>"
+    info_values = [
+        Paragraph(f"<b>{date_display}</b>", styles['BoldSmallCustom']),
+        Paragraph(f"<b>{ship_to}</b>", styles['BoldSmallCustom']),
+        Paragraph(site_gabungan, styles['BoldSmallCustom']),
+        Paragraph(f"<b>{no_po}</b>", styles['BoldSmallCustom']),
+        Paragraph(f"<b>{tgl_po_display}</b>", styles['BoldSmallCustom']),
+        "",
+    ]
+    info_kanan_data = [[label, ":", value] for label, value in zip(template.info_kanan_labels, info_values)]
+    info_kanan_table = Table(info_kanan_data, colWidths=[3.5*cm, 0.2*cm, 6.3*cm])
+    info_kanan_table.setStyle(template.info_kanan_style)
+
+    info_gabungan_table = Table([[info_kiri_table, info_kanan_table]], colWidths=[LEBAR_KOLOM_KIRI, LEBAR_KOLOM_KANAN])
+    info_gabungan_table.setStyle(template.info_gabungan_style)
+    
+    elements.append(center_table(info_gabungan_table))
+    elements.append(Spacer(1, 5*mm))
+
+    # --- Tabel Kuantitas ---
+    transportir_text = Paragraph(f"<b>{transportir}</b><br/>Fleet No. <b>{fleet_no}</b><br/>An. <b>{driver}</b>", styles['BoldSmallCustom'])
+    qty_parag = Paragraph(f"<b>{qty_display}</b>", styles['HeaderTitleCustom']) 
+
+    items_data = [
+        ["No.", "Quantity", "Description", "Diangkut Oleh Transportir"],
+        ["1", qty_parag, jenis_bbm, transportir_text]
+    ]
+    
+    items_table = Table(items_data, colWidths=[1.5*cm, 3.5*cm, 8.0*cm, 6.0*cm], rowHeights=[None, 1.8*cm])
+    items_table.setStyle(template.items_style)
+    
+    elements.append(center_table(items_table))
+    elements.append(Spacer(1, 5*mm))
+
+    # --- BERITA ACARA PENERIMAAN BBM / FUEL ---
+    elements.append(template.berita_acara_header)
+
+    penerimaan_data = [list(row) for row in template.penerimaan_rows]
+    penerimaan_data[1][1] = Paragraph(f"Volume dikirim : <b>{qty_display}</b> Liter", styles['BoldSmallCustom'])
+    penerimaan_table = Table(penerimaan_data, colWidths=[1*cm, 6.5*cm, 5.75*cm, 5.75*cm]) 
+    penerimaan_table.setStyle(template.penerimaan_style)
+    elements.append(center_table(penerimaan_table))
+
+    # --- Catatan & TTD Footer ---
+    elements.extend(template.footer)
+
+    # Flowable statis di template dipakai bersama, jadi build dijalankan satu per satu
+    with template.lock:
+        doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+# --- Cetak Massal (Process Pool) ---
+
+def process_pool(max_workers=None):
+    """
+    Process pool untuk cetak massal, dengan start method 'spawn' (bukan fork): proses induk
+    menjalankan thread render (pdf_cache.submit_render) yang bisa sedang memegang template.lock,
+    dan fork pada saat itu menyalin lock yang terkunci ke worker sehingga batch macet.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+def render_pdf_job(data_row):
+    """Dijalankan di proses worker: membuat satu PDF dan mencatat durasi/errornya."""
+    start = time.perf_counter()
+    result = {"NOMOR DO": str(data_row.get("NOMOR DO", "")), "pdf": None, "Error": ""}
+    try:
+        result["pdf"] = build_pdf_sha(data_row).getvalue()
+    except Exception as e:
+        result["Error"] = f"{type(e).__name__}: {e}"
+    result["Durasi (detik)"] = round(time.perf_counter() - start, 3)
+    return result
+
+@instrumentation.timed("pdf.build_pdf_batch")
+def build_pdf_batch(data_rows, output="merged", max_workers=None):
+    """
+    Membuat banyak PDF Surat Jalan secara paralel di process pool.
+
+    output="merged" menghasilkan satu PDF multi-halaman, output="zip" menghasilkan
+    ZIP berisi satu PDF per DO. DO yang gagal tidak menghentikan batch.
+    Mengembalikan (bytes hasil atau None jika semua gagal, laporan per DO).
+    """
+    data_rows = list(data_rows)
+    if not data_rows:
+        return None, []
+
+    workers = max_workers or min(len(data_rows), os.cpu_count() or 1)
+    with process_pool(workers) as executor:
+        results = list(executor.map(render_pdf_job, data_rows, chunksize=max(1, len(data_rows) // (workers * 4))))
+
+    report = [{k: v for k, v in r.items() if k != "pdf"} for r in results]
+    rendered = [r for r in results if r["pdf"] is not None]
+    if not rendered:
+        return None, report
+
+    buffer = io.BytesIO()
+    if output == "zip":
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for r in rendered:
+                zf.writestr(safe_pdf_filename(r["NOMOR DO"]), r["pdf"])
+    else:
+        from pypdf import PdfWriter
+        writer = PdfWriter()
+        for r in rendered:
+            writer.append(io.BytesIO(r["pdf"]))
+        writer.write(buffer)
+    return buffer.getvalue(), report
@@ -0,0 +1,172 @@
+"""
+Index pencarian dan filter untuk halaman Rekap, dibangun sekali per versi data.
+
+- Kunci pencarian: kolom-kolom yang bisa dicari digabung menjadi satu teks huruf kecil
+  per baris. Pencarian substring cukup satu operasi vektor (str.contains tanpa regex).
+- FacetIndex: setiap facet (Tahun, Bulan, Transportir, Jenis BBM, Client) disimpan sebagai
+  kode integer per baris. Filter = tabel lookup boolean per facet (OR di dalam facet),
+  digabung dengan AND antar facet; jumlah baris per opsi dihitung dengan bincount.
+- DOIndex: hash NOMOR DO -> posisi baris untuk lookup, cek keberadaan dan hapus (halaman Input).
+
+Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga dari skrip/benchmark.
+"""
+import numpy as np
+import pandas as pd
+
+# Kolom yang ikut dicari oleh kotak "Pencarian cepat"
+SEARCH_COLUMNS = [
+    "NOMOR DO", "Client", "Nama Driver", "PO Client", "PO Pertamina", "SPO-Letter",
+    "Fleet Number", "Site/Discharge Addr Line 1", "Site/Discharge Addr Line 2",
+]
+
+# Pemisah antar kolom: tidak bisa diketik di kotak pencarian, jadi hasil tidak
+# pernah "menyambung" akhir satu kolom dengan awal kolom berikutnya
+FIELD_SEPARATOR = "\x1f"
+
+MIN_SEARCH_LENGTH = 3
+
+
+def build_search_key(df):
+    """Membangun kolom kunci pencarian (lowercase, semua SEARCH_COLUMNS digabung) dengan index sama seperti df."""
+    columns = [col for col in SEARCH_COLUMNS if col in df.columns]
+    if df.empty or not columns:
+        return pd.Series("", index=df.index, dtype="str")
+    key = df[columns[0]].astype(str).fillna("")
+    for col in columns[1:]:
+        key = key + FIELD_SEPARATOR + df[col].astype(str).fillna("")
+    return key.str.lower()
+
+
+def search_mask(search_key, term):
+    """Mask boolean baris yang mengandung term (substring, tidak peka huruf besar/kecil)."""
+    term = str(term).strip().lower()
+    if not term:
+        return pd.Series(True, index=search_key.index)
+    return search_key.str.contains(term, regex=False)
+
+
+# --- Facet Filter ---
+
+FACET_COLUMNS = ["Year", "Month", "Transportir", "Jenis BBM", "Client"]
+
+# Opsi facet Year untuk DO tanpa tanggal ('Date' kosong/rusak)
+NO_DATE_OPTION = ""
+
+MONTH_ORDER = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+
+def facet_values(df, facet):
+    """Nilai facet per baris; Year diturunkan dari kolom Date."""
+    if facet == "Year":
+        return df["Date"].dt.year.astype("Int64")
+    return df[facet]
+
+
+def sort_facet_options(facet, values):
+    if facet == "Year":
+        years = sorted((v for v in values if v != NO_DATE_OPTION), reverse=True)
+        return years + [NO_DATE_OPTION] if NO_DATE_OPTION in values else years
+    if facet == "Month":
+        return sorted(values, key=lambda m: (MONTH_ORDER.index(m) if m in MONTH_ORDER else len(MONTH_ORDER), str(m)))
+    return sorted(values, key=str)
+
+
+class FacetIndex:
+    """Kode integer per baris untuk setiap facet, untuk filter dan hitungan tanpa menyalin DataFrame."""
+
+    def __init__(self, df):
+        self.size = len(df)
+        self._codes = {}
+        self._options = {}
+        self._code_of = {}
+        for facet in FACET_COLUMNS:
+            if facet not in df.columns and not (facet == "Year" and "Date" in df.columns):
+                continue
+            codes, uniques = pd.factorize(facet_values(df, facet), use_na_sentinel=True)
+            uniques = [v.item() if hasattr(v, "item") else v for v in uniques]
+            if facet == "Year" and (codes < 0).any():
+                # DO tanpa tanggal bisa dipilih sebagai opsi Year tersendiri
+                uniques.append(NO_DATE_OPTION)
+                codes = np.where(codes < 0, len(uniques) - 1, codes)
+            # Nilai kosong (NaN/NaT) mendapat kode terakhir agar tetap bisa dipakai sebagai index lookup
+            self._codes[facet] = np.where(codes < 0, len(uniques), codes).astype(np.int32)
+            self._options[facet] = sort_facet_options(facet, uniques)
+            self._code_of[facet] = {value: code for code, value in enumerate(uniques)}
+
+    def options(self, facet):
+        """Semua nilai facet yang ada di data (urut untuk ditampilkan)."""
+        return list(self._options.get(facet, []))
+
+    def facet_mask(self, facet, selected):
+        """Baris yang nilai facet-nya ada di selected (OR di dalam satu facet)."""
+        codes = self._codes.get(facet)
+        if codes is None:
+            return np.ones(self.size, dtype=bool)
+        lookup = np.zeros(len(self._code_of[facet]) + 1, dtype=bool)
+        for value in selected:
+            code = self._code_of[facet].get(value)
+            if code is not None:
+                lookup[code] = True
+        return lookup[codes]
+
+    def mask(self, selections, exclude=None):
+        """
+        Mask gabungan untuk selections = {facet: daftar nilai terpilih} (AND antar facet).
+        Facet yang tidak ada di selections tidak memfilter; exclude melewatkan satu facet.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for facet, selected in selections.items():
+            if facet != exclude:
+                mask &= self.facet_mask(facet, selected)
+        return mask
+
+    def counts(self, facet, selections):
+        """Jumlah baris per nilai facet dengan filter facet lain diterapkan (untuk label opsi)."""
+        codes = self._codes.get(facet)
+        if codes is None:
+            return {}
+        per_code = np.bincount(
+            codes[self.mask(selections, exclude=facet)], minlength=len(self._code_of[facet]) + 1
+        )
+        return {value: int(per_code[code]) for value, code in self._code_of[facet].items()}
+
+
+# --- Index NOMOR DO ---
+
+class DOIndex:
+    """
+    Hash NOMOR DO -> posisi baris di DataFrame dataset: cek keberadaan dan lookup O(1) dengan
+    kecocokan persis ('181025-1' tidak cocok dengan '181025-10'), tanpa memindai kolom.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        keys = df["NOMOR DO"].astype(str).str.strip().tolist() if "NOMOR DO" in df.columns else []
+        # NOMOR DO unik di database (PRIMARY KEY); jika tetap ada duplikat, baris pertama dipakai
+        self._positions = {key: position for position, key in reversed(list(enumerate(keys))) if key}
+        self._options = None
+
+    def __contains__(self, nomor_do):
+        return str(nomor_do).strip() in self._positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def row(self, nomor_do):
+        """Baris DO (Series), atau None jika NOMOR DO tidak ada."""
+        position = self._positions.get(str(nomor_do).strip())
+        return None if position is None else self.df.iloc[position]
+
+    def rows(self, nomor_dos):
+        """DataFrame baris-baris DO (urutan mengikuti nomor_dos; yang tidak ada dilewati)."""
+        positions = [self._positions[key] for key in (str(k).strip() for k in nomor_dos) if key in self._positions]
+        return self.df.iloc[positions]
+
+    def options(self):
+        """Semua NOMOR DO, urutan teks menurun (DO terbaru di atas); diurutkan sekali per index."""
+        if self._options is None:
+            self._options = sorted(self._positions, reverse=True)
+        return self._options
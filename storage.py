@@ -0,0 +1,1358 @@
+"""
+Lapisan penyimpanan data Delivery Order (DO).
+
+- SQLiteStorage   : database lokal (sumber utama) dengan index pada NOMOR DO, Date, Transportir,
+                    plus counter urutan NOMOR DO per hari.
+- GSheetsStorage  : Google Sheets, dipakai sebagai mirror/replika.
+- PartitionedGSheetsStorage : mirror Google Sheets yang dipecah per tahun (satu worksheet
+                    per tahun 'Date' DO), diambil paralel dan di-cache per partisi.
+- MirroredStorage : baca/tulis langsung ke SQLite, lalu menyalin perubahan ke
+                    Google Sheets lewat background thread. Antrian (outbox) disimpan di
+                    SQLite dalam transaksi yang sama dengan perubahan data, jadi tetap
+                    utuh walau Google Sheets offline atau aplikasi di-restart.
+
+Modul ini tidak bergantung pada Streamlit agar bisa dipakai juga dari skrip/CLI.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import instrumentation
+
+NEW_COLUMNS = [
+    "No", "Month", "SPO-Letter", "NOMOR DO", "Date", "Source", "Transportir",
+    "Client", "Site/Discharge Addr Line 1", "Site/Discharge Addr Line 2",
+    "PO Client", "Tgl PO", "PO Pertamina", "PIC Delivery", "Qty", "Jenis BBM",
+    "Fleet Number", "Nama Driver", "Keterangan"
+]
+
+DATE_COLUMNS = ["Date", "Tgl PO"]
+DATE_FORMAT = '%Y-%m-%d'
+
+# NOMOR DO = <tanggal ddmmyy>-<urutan harian 2 digit>, e.g. '181025-07'
+DO_DATE_FORMAT = "%d%m%y"
+
+# Tipe setiap kolom saat dimuat ke DataFrame:
+#   "id"       : teks kode/nomor (akhiran ".0" dari angka float dibuang)
+#   "string"   : teks bebas
+#   "category" : teks dengan sedikit nilai unik (hemat memori, filter lebih cepat)
+#   "date"     : tanggal ISO 'YYYY-MM-DD' (datetime64)
+#   "float"    : angka
+COLUMN_SCHEMA = {
+    "No": "float",
+    "Month": "category",
+    "SPO-Letter": "id",
+    "NOMOR DO": "id",
+    "Date": "date",
+    "Source": "category",
+    "Transportir": "category",
+    "Client": "string",
+    "Site/Discharge Addr Line 1": "string",
+    "Site/Discharge Addr Line 2": "string",
+    "PO Client": "id",
+    "Tgl PO": "date",
+    "PO Pertamina": "id",
+    "PIC Delivery": "string",
+    "Qty": "float",
+    "Jenis BBM": "category",
+    "Fleet Number": "id",
+    "Nama Driver": "string",
+    "Keterangan": "string",
+}
+
+
+# --- Helper Konversi Nilai ---
+
+def format_cell_value(value):
+    """Mengubah satu nilai Python/pandas menjadi nilai yang aman dikirim ke Google Sheets/SQLite."""
+    if value is None:
+        return ""
+    try:
+        # Dicek sebelum strftime: pd.NaT juga punya strftime, tetapi melempar ValueError
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "strftime"):
+        return value.strftime(DATE_FORMAT)
+    if hasattr(value, "item"):
+        # numpy scalar -> tipe Python biasa (agar bisa di-serialize ke JSON)
+        return value.item()
+    return value
+
+def normalize_date(value):
+    """Menyeragamkan tanggal ke format ISO 'YYYY-MM-DD' (string kosong jika tidak valid)."""
+    value = format_cell_value(value)
+    if value == "":
+        return ""
+    if isinstance(value, str):
+        try:
+            # Jalur cepat untuk nilai yang sudah ISO (kasus paling umum); pd.to_datetime jauh lebih lambat
+            datetime.strptime(value, DATE_FORMAT)
+            return value
+        except ValueError:
+            pass
+    try:
+        return pd.to_datetime(value).strftime(DATE_FORMAT)
+    except (ValueError, TypeError):
+        return str(value)
+
+def row_fingerprint(data_row):
+    """Sidik jari isi satu baris (setelah dinormalisasi) untuk mendeteksi perubahan."""
+    row = normalize_row(data_row)
+    values = []
+    for col in NEW_COLUMNS:
+        value = row[col]
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        values.append(str(value))
+    return hash(tuple(values))
+
+def do_number_prefix(day=None):
+    """Prefix tanggal NOMOR DO (ddmmyy) untuk hari tertentu; default hari ini."""
+    return (day or datetime.now()).strftime(DO_DATE_FORMAT)
+
+def format_do_number(prefix, sequence):
+    return f"{prefix}-{sequence:02d}"
+
+def normalize_row(data_row):
+    """Mengambil hanya kolom NEW_COLUMNS dari satu baris dan menyeragamkan nilainya."""
+    row = {}
+    for col in NEW_COLUMNS:
+        value = data_row.get(col)
+        row[col] = normalize_date(value) if col in DATE_COLUMNS else format_cell_value(value)
+    row["NOMOR DO"] = str(row["NOMOR DO"]).strip()
+    return row
+
+
+# --- Interface Storage ---
+
+class StaleWriteError(Exception):
+    """DO sudah diubah (sesi/operator lain) sejak revisi yang dimuat oleh penulis."""
+
+    def __init__(self, nomor_do, expected_rev, current_rev):
+        super().__init__(
+            f"DO {nomor_do} sudah diubah sejak dimuat (revisi {expected_rev}, sekarang {current_rev})"
+        )
+        self.nomor_do = nomor_do
+        self.expected_rev = expected_rev
+        self.current_rev = current_rev
+
+
+class DuplicateDOError(StaleWriteError):
+    """DO baru (expected_rev=0) memakai NOMOR DO yang sudah ada di database."""
+
+    def __init__(self, nomor_do, current_rev):
+        Exception.__init__(self, f"NOMOR DO {nomor_do} sudah dipakai DO lain")
+        self.nomor_do = nomor_do
+        self.expected_rev = 0
+        self.current_rev = current_rev
+
+
+class DOStorage:
+    """Interface penyimpanan DO. Semua baris memakai nama kolom NEW_COLUMNS."""
+
+    def load(self):
+        """Mengembalikan seluruh data sebagai DataFrame."""
+        raise NotImplementedError
+
+    def get(self, nomor_do):
+        """Mengembalikan satu baris (dict) untuk NOMOR DO, atau None jika tidak ada."""
+        raise NotImplementedError
+
+    def upsert(self, data_row):
+        """Menambah DO baru atau memperbarui DO yang sudah ada."""
+        raise NotImplementedError
+
+    def delete(self, nomor_do):
+        """Menghapus satu DO. Mengembalikan True jika ada baris yang dihapus."""
+        raise NotImplementedError
+
+    def query(self, date_from=None, date_to=None, transportir=None, jenis_bbm=None):
+        """Mengembalikan DataFrame yang difilter rentang tanggal, transportir dan jenis BBM."""
+        return filter_frame(self.load(), date_from, date_to, transportir, jenis_bbm)
+
+
+def filter_frame(df, date_from=None, date_to=None, transportir=None, jenis_bbm=None):
+    """Filter DOStorage.query untuk DataFrame yang sudah dimuat."""
+    if df.empty:
+        return df
+    dates = df["Date"].astype(str)
+    mask = pd.Series(True, index=df.index)
+    if date_from is not None:
+        mask &= dates >= normalize_date(date_from)
+    if date_to is not None:
+        mask &= dates <= normalize_date(date_to)
+    if transportir:
+        mask &= df["Transportir"].isin(transportir)
+    if jenis_bbm:
+        mask &= df["Jenis BBM"].isin(jenis_bbm)
+    return df[mask]
+
+
+# --- SQLite (Lokal) ---
+
+class SQLiteStorage(DOStorage):
+    """Penyimpanan lokal di file SQLite."""
+
+    TABLE = "delivery_orders"
+    # Kolom data saja (tanpa kolom internal "_rev")
+    SELECT_COLUMNS = ", ".join(f'"{col}"' for col in NEW_COLUMNS)
+
+    def __init__(self, path):
+        self.path = path
+        self._init_schema()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        columns_sql = ", ".join(
+            f'"{col}" TEXT PRIMARY KEY' if col == "NOMOR DO"
+            else f'"{col}" REAL' if col == "Qty"
+            else f'"{col}"'
+            for col in NEW_COLUMNS
+        )
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} ({columns_sql}, "_rev" INTEGER NOT NULL DEFAULT 0)')
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.TABLE})")}
+            if "_rev" not in existing:
+                conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "_rev" INTEGER NOT NULL DEFAULT 0')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_do_date ON {self.TABLE} ("Date")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_do_transportir ON {self.TABLE} ("Transportir")')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_do_bbm ON {self.TABLE} ("Jenis BBM")')
+            conn.execute('CREATE TABLE IF NOT EXISTS storage_meta (key TEXT PRIMARY KEY, value INTEGER)')
+            conn.execute("INSERT OR IGNORE INTO storage_meta VALUES ('data_version', 0)")
+            # Identitas database: versi data mulai dari 0 lagi jika dbase.sqlite dibuat ulang
+            conn.execute("INSERT OR IGNORE INTO storage_meta VALUES ('database_id', ?)", (f"db-{uuid.uuid4().hex}",))
+            # Counter urutan NOMOR DO per hari (prefix ddmmyy -> urutan terakhir yang sudah dipesan)
+            conn.execute('CREATE TABLE IF NOT EXISTS do_sequence (prefix TEXT PRIMARY KEY, last_seq INTEGER NOT NULL)')
+            self._init_aggregates(conn)
+            # Antrian perubahan yang belum terkirim ke Google Sheets (write-behind yang tahan restart)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT NOT NULL, "
+                '"NOMOR DO" TEXT NOT NULL, payload TEXT, created_at REAL NOT NULL)'
+            )
+
+    # --- Agregat Bulanan ---
+
+    # Kunci cube: bulan 'YYYY-MM' (dari Date) x Transportir x Jenis BBM x Client
+    AGG_KEYS = [
+        ("month", 'substr(coalesce({row}."Date", \'\'), 1, 7)'),
+        ("transportir", 'coalesce({row}."Transportir", \'\')'),
+        ("jenis_bbm", 'coalesce({row}."Jenis BBM", \'\')'),
+        ("client", 'coalesce({row}."Client", \'\')'),
+    ]
+
+    def _agg_key_sql(self, row):
+        return ", ".join(expr.format(row=row) for _, expr in self.AGG_KEYS)
+
+    def _init_aggregates(self, conn):
+        """
+        Tabel agg_monthly (jumlah Qty dan jumlah DO per bulan x Transportir x Jenis BBM x Client)
+        dijaga oleh trigger, jadi setiap simpan/hapus lewat jalur mana pun memperbarui cube
+        di transaksi yang sama tanpa menghitung ulang seluruh data.
+        """
+        created = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agg_monthly'"
+        ).fetchone() is None
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS agg_monthly ("
+            "month TEXT, transportir TEXT, jenis_bbm TEXT, client TEXT, "
+            "qty_sum REAL NOT NULL, do_count INTEGER NOT NULL, "
+            "PRIMARY KEY (month, transportir, jenis_bbm, client))"
+        )
+        add_new = (
+            f'INSERT INTO agg_monthly VALUES ({self._agg_key_sql("NEW")}, coalesce(NEW."Qty" + 0, 0), 1) '
+            "ON CONFLICT (month, transportir, jenis_bbm, client) DO UPDATE SET "
+            "qty_sum = qty_sum + excluded.qty_sum, do_count = do_count + 1;"
+        )
+        where_old = " AND ".join(f"{name} = {expr.format(row='OLD')}" for name, expr in self.AGG_KEYS)
+        remove_old = (
+            f'UPDATE agg_monthly SET qty_sum = qty_sum - coalesce(OLD."Qty" + 0, 0), do_count = do_count - 1 '
+            f"WHERE {where_old}; "
+            f"DELETE FROM agg_monthly WHERE {where_old} AND do_count <= 0;"
+        )
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS agg_monthly_insert AFTER INSERT ON {self.TABLE} BEGIN {add_new} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS agg_monthly_delete AFTER DELETE ON {self.TABLE} BEGIN {remove_old} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS agg_monthly_update AFTER UPDATE ON {self.TABLE} BEGIN {remove_old} {add_new} END")
+        if created:
+            self._rebuild_aggregates(conn)
+
+    def _rebuild_aggregates(self, conn):
+        key = self._agg_key_sql(self.TABLE)
+        conn.execute("DELETE FROM agg_monthly")
+        conn.execute(
+            f'INSERT INTO agg_monthly SELECT {key}, SUM(coalesce("Qty" + 0, 0)), COUNT(*) '
+            f"FROM {self.TABLE} GROUP BY 1, 2, 3, 4"
+        )
+
+    def rebuild_monthly_aggregates(self):
+        """Menghitung ulang seluruh cube agg_monthly dari data (perbaikan manual)."""
+        with self.connect() as conn:
+            self._rebuild_aggregates(conn)
+
+    def monthly_aggregates(self):
+        """Cube bulanan sebagai DataFrame: Bulan ('YYYY-MM'), Transportir, Jenis BBM, Client, Qty, Jumlah DO."""
+        with self.connect() as conn:
+            return pd.read_sql_query(
+                'SELECT month AS "Bulan", transportir AS "Transportir", jenis_bbm AS "Jenis BBM", '
+                'client AS "Client", qty_sum AS "Qty", do_count AS "Jumlah DO" '
+                "FROM agg_monthly ORDER BY month",
+                conn
+            )
+
+    def bump_version(self, conn):
+        """Menaikkan versi data (dipanggil di transaksi yang sama dengan perubahan data)."""
+        conn.execute("UPDATE storage_meta SET value = value + 1 WHERE key = 'data_version'")
+
+    def data_version(self):
+        """
+        Versi data '<database_id>:<nomor>'; berubah setiap ada tulis, termasuk dari proses lain (CLI).
+        Identitas database ikut di dalamnya agar cache di disk (mis. exports_cache/) dari database
+        lama tidak cocok dengan versi database baru yang nomornya kebetulan sama.
+        """
+        with self.connect() as conn:
+            meta = dict(conn.execute(
+                "SELECT key, value FROM storage_meta WHERE key IN ('database_id', 'data_version')"
+            ))
+        return f"{meta['database_id']}:{meta['data_version']}"
+
+    def get_meta(self, key, default=None):
+        with self.connect() as conn:
+            row = conn.execute("SELECT value FROM storage_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT INTO storage_meta VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    # --- Outbox Sinkronisasi ---
+
+    def _outbox_add(self, conn, action, nomor_do, row=None):
+        conn.execute(
+            'INSERT INTO sync_outbox (action, "NOMOR DO", payload, created_at) VALUES (?, ?, ?, ?)',
+            (action, nomor_do, json.dumps(row, default=str) if row is not None else None, time.time())
+        )
+
+    def outbox_count(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+
+    def outbox_peek(self, limit=None):
+        """Operasi terdepan di outbox: list (id, action, NOMOR DO atau baris)."""
+        limit_sql = f"LIMIT {int(limit)}" if limit else ""
+        with self.connect() as conn:
+            rows = conn.execute(
+                f'SELECT id, action, "NOMOR DO", payload FROM sync_outbox ORDER BY id {limit_sql}'
+            ).fetchall()
+        return [
+            (op_id, action, json.loads(payload) if action == "upsert" else nomor_do)
+            for op_id, action, nomor_do, payload in rows
+        ]
+
+    def outbox_remove(self, op_ids):
+        op_ids = list(op_ids)
+        with self.connect() as conn:
+            for start in range(0, len(op_ids), 500):
+                chunk = op_ids[start:start + 500]
+                conn.execute(f"DELETE FROM sync_outbox WHERE id IN ({', '.join('?' for _ in chunk)})", chunk)
+
+    def outbox_drop_keys(self, nomor_dos):
+        """Membuang semua operasi outbox untuk NOMOR DO tertentu (perubahan lokal yang ditolak)."""
+        with self.connect() as conn:
+            conn.executemany('DELETE FROM sync_outbox WHERE "NOMOR DO" = ?', [(k,) for k in nomor_dos])
+
+    def acquire_sync_lease(self, owner, ttl_seconds):
+        """
+        Hanya satu proses (aplikasi / CLI) yang mengirim outbox pada satu waktu, agar baris
+        yang sama tidak di-append dua kali. Mengembalikan True jika owner memegang lease.
+        """
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT value FROM storage_meta WHERE key = 'sync_lease'").fetchone()
+            holder, expires = (row[0].split("|") + ["0"])[:2] if row else ("", "0")
+            if holder not in ("", owner) and float(expires) > now:
+                conn.rollback()
+                return False
+            conn.execute(
+                "INSERT INTO storage_meta VALUES ('sync_lease', ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (f"{owner}|{now + ttl_seconds}",)
+            )
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def count(self):
+        with self.connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def keys(self):
+        """Semua NOMOR DO di database (hanya primary key, tanpa memuat baris)."""
+        with self.connect() as conn:
+            return {row[0] for row in conn.execute(f'SELECT "NOMOR DO" FROM {self.TABLE}')}
+
+    # --- Nomor DO ---
+
+    def _max_sequence_in_table(self, conn, prefix):
+        """Urutan tertinggi yang sudah dipakai untuk prefix (range scan di primary key, hanya DO hari itu)."""
+        rows = conn.execute(
+            f'SELECT "NOMOR DO" FROM {self.TABLE} WHERE "NOMOR DO" >= ? AND "NOMOR DO" < ?',
+            (f"{prefix}-", f"{prefix}.")
+        ).fetchall()
+        max_seq = 0
+        for (nomor_do,) in rows:
+            try:
+                max_seq = max(max_seq, int(nomor_do.rsplit("-", 1)[-1]))
+            except ValueError:
+                continue
+        return max_seq
+
+    def _last_sequence(self, conn, prefix):
+        row = conn.execute("SELECT last_seq FROM do_sequence WHERE prefix = ?", (prefix,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self._max_sequence_in_table(conn, prefix)
+
+    def peek_do_number(self, day=None):
+        """Perkiraan NOMOR DO berikutnya (untuk ditampilkan di form); tidak memesan nomor."""
+        prefix = do_number_prefix(day)
+        with self.connect() as conn:
+            return format_do_number(prefix, self._last_sequence(conn, prefix) + 1)
+
+    def reserve_do_number(self, day=None):
+        """
+        Memesan NOMOR DO berikutnya secara atomik (BEGIN IMMEDIATE mengunci penulis lain),
+        jadi dua sesi yang menyimpan bersamaan tidak pernah mendapat nomor yang sama.
+        Nomor yang sudah dipesan tidak dipakai ulang walaupun DO-nya tidak jadi disimpan.
+        """
+        return self.reserve_do_numbers(1, day)[0]
+
+    def reserve_do_numbers(self, count, day=None):
+        """Memesan count NOMOR DO berurutan dalam satu transaksi (dipakai import massal)."""
+        prefix = do_number_prefix(day)
+        numbers = []
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            sequence = self._last_sequence(conn, prefix)
+            while len(numbers) < count:
+                sequence += 1
+                nomor_do = format_do_number(prefix, sequence)
+                # DO hari ini yang masuk dari Google Sheets (instance lain) belum tercatat di counter
+                if not conn.execute(f'SELECT 1 FROM {self.TABLE} WHERE "NOMOR DO" = ?', (nomor_do,)).fetchone():
+                    numbers.append(nomor_do)
+            conn.execute(
+                "INSERT INTO do_sequence (prefix, last_seq) VALUES (?, ?) "
+                "ON CONFLICT(prefix) DO UPDATE SET last_seq = excluded.last_seq",
+                (prefix, sequence)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return numbers
+
+    def max_row_number(self):
+        """Nilai kolom "No" tertinggi (0 jika kosong); DO baru mendapat No = nilai ini + 1."""
+        with self.connect() as conn:
+            value = conn.execute(f'SELECT MAX(CAST("No" AS REAL)) FROM {self.TABLE} WHERE "No" != \'\'').fetchone()[0]
+        return int(value or 0)
+
+    @instrumentation.timed("sqlite.load")
+    def load(self):
+        with self.connect() as conn:
+            return pd.read_sql_query(f"SELECT {self.SELECT_COLUMNS} FROM {self.TABLE} ORDER BY rowid", conn)
+
+    def get(self, nomor_do):
+        with self.connect() as conn:
+            row = conn.execute(
+                f'SELECT {self.SELECT_COLUMNS} FROM {self.TABLE} WHERE "NOMOR DO" = ?', (str(nomor_do).strip(),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def revision(self, nomor_do):
+        """Revisi baris DO (naik setiap kali baris ditulis); 0 jika DO belum ada."""
+        with self.connect() as conn:
+            return self._revision(conn, str(nomor_do).strip())
+
+    def _revision(self, conn, nomor_do):
+        row = conn.execute(f'SELECT "_rev" FROM {self.TABLE} WHERE "NOMOR DO" = ?', (nomor_do,)).fetchone()
+        return row[0] if row else 0
+
+    def _upsert_sql(self):
+        cols_sql = ", ".join(f'"{col}"' for col in NEW_COLUMNS)
+        placeholders = ", ".join("?" for _ in NEW_COLUMNS)
+        updates_sql = ", ".join(f'"{col}" = excluded."{col}"' for col in NEW_COLUMNS if col != "NOMOR DO")
+        return (
+            f'INSERT INTO {self.TABLE} ({cols_sql}, "_rev") VALUES ({placeholders}, 1) '
+            f'ON CONFLICT("NOMOR DO") DO UPDATE SET {updates_sql}, "_rev" = "_rev" + 1'
+        )
+
+    @instrumentation.timed("sqlite.upsert")
+    def upsert(self, data_row, expected_rev=None, queue_sync=False):
+        """
+        Menyimpan satu DO dan mengembalikan revisi barunya.
+        Jika expected_rev diberikan (0 = DO baru), penulisan ditolak dengan StaleWriteError
+        bila revisi di database sudah berbeda, jadi perubahan operator lain tidak tertimpa diam-diam;
+        DO baru dengan NOMOR DO yang sudah ada ditolak dengan DuplicateDOError (NOMOR DO unik).
+        queue_sync=True menambahkan perubahan ke outbox di transaksi yang sama.
+        """
+        row = normalize_row(data_row)
+        if not row["NOMOR DO"]:
+            raise ValueError("NOMOR DO kosong")
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            current_rev = self._revision(conn, row["NOMOR DO"])
+            if expected_rev == 0 and current_rev > 0:
+                raise DuplicateDOError(row["NOMOR DO"], current_rev)
+            if expected_rev is not None and current_rev != expected_rev:
+                raise StaleWriteError(row["NOMOR DO"], expected_rev, current_rev)
+            conn.execute(self._upsert_sql(), [row[col] for col in NEW_COLUMNS])
+            if queue_sync:
+                self._outbox_add(conn, "upsert", row["NOMOR DO"], row)
+            self.bump_version(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return current_rev + 1
+
+    def upsert_many(self, data_rows, queue_sync=False):
+        """Menyimpan banyak DO dalam satu transaksi (tanpa cek revisi)."""
+        rows = [normalize_row(r) for r in data_rows]
+        if not rows:
+            return
+        with self.connect() as conn:
+            conn.executemany(self._upsert_sql(), [[row[col] for col in NEW_COLUMNS] for row in rows])
+            if queue_sync:
+                conn.executemany(
+                    'INSERT INTO sync_outbox (action, "NOMOR DO", payload, created_at) VALUES (\'upsert\', ?, ?, ?)',
+                    [(row["NOMOR DO"], json.dumps(row, default=str), time.time()) for row in rows]
+                )
+            self.bump_version(conn)
+
+    def delete(self, nomor_do, queue_sync=False):
+        nomor_do = str(nomor_do).strip()
+        with self.connect() as conn:
+            cur = conn.execute(f'DELETE FROM {self.TABLE} WHERE "NOMOR DO" = ?', (nomor_do,))
+            if cur.rowcount > 0:
+                if queue_sync:
+                    self._outbox_add(conn, "delete", nomor_do)
+                self.bump_version(conn)
+            return cur.rowcount > 0
+
+    def replace_all(self, df):
+        """
+        Mengganti seluruh isi tabel (dipakai saat seed/resync dari Google Sheets) dalam satu
+        transaksi: jika gagal di tengah jalan, isi lama tetap utuh.
+        """
+        rows = [normalize_row(r) for r in df.to_dict("records")]
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f"DELETE FROM {self.TABLE}")
+            conn.executemany(self._upsert_sql(), [[row[col] for col in NEW_COLUMNS] for row in rows])
+            self.bump_version(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @instrumentation.timed("sqlite.query")
+    def query(self, date_from=None, date_to=None, transportir=None, jenis_bbm=None):
+        clauses, params = [], []
+        if date_from is not None:
+            clauses.append('"Date" >= ?')
+            params.append(normalize_date(date_from))
+        if date_to is not None:
+            clauses.append('"Date" <= ?')
+            params.append(normalize_date(date_to))
+        if transportir:
+            clauses.append(f'"Transportir" IN ({", ".join("?" for _ in transportir)})')
+            params.extend(transportir)
+        if jenis_bbm:
+            clauses.append(f'"Jenis BBM" IN ({", ".join("?" for _ in jenis_bbm)})')
+            params.extend(jenis_bbm)
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.connect() as conn:
+            return pd.read_sql_query(
+                f"SELECT {self.SELECT_COLUMNS} FROM {self.TABLE} {where_sql} ORDER BY rowid", conn, params=params
+            )
+
+
+# --- Google Sheets (Mirror) ---
+
+class GSheetsStorage(DOStorage):
+    """
+    Penyimpanan di satu worksheet Google Sheets, ditulis per baris (bukan tulis ulang sheet).
+    gspread diimport di dalam method agar modul ini ringan untuk pemakai tanpa Google Sheets.
+    """
+
+    # Edit langsung di tengah sheet yang terjadi bersamaan dengan append tidak terlihat oleh
+    # jalur baca-ekor, jadi sesekali seluruh baris dibaca ulang dan dibandingkan sidik jarinya.
+    FULL_RECONCILE_SECONDS = 30 * 60
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self._header = None
+        self._row_map = None
+        # Status sinkron terakhir: waktu ubah spreadsheet dan sidik jari per NOMOR DO (urut baris)
+        self._synced_update_time = None
+        self._synced_rows = None
+        self._last_full_fetch = 0.0
+
+    def load_row_map(self):
+        """Membaca header dan kolom NOMOR DO, lalu memetakan NOMOR DO -> nomor baris di sheet."""
+        header = self.worksheet.row_values(1)
+        row_map = {}
+        if "NOMOR DO" in header:
+            do_values = self.worksheet.col_values(header.index("NOMOR DO") + 1)
+            # Baris 1 adalah header, data dimulai dari baris 2
+            for row_number, value in enumerate(do_values[1:], start=2):
+                key = str(value).strip()
+                if key:
+                    row_map[key] = row_number
+        self._header, self._row_map = header, row_map
+        return header, row_map
+
+    def ensure_header(self):
+        """Menulis header NEW_COLUMNS jika sheet masih kosong."""
+        header = self._header if self._header is not None else self.load_row_map()[0]
+        if not header:
+            self.worksheet.update([NEW_COLUMNS], 'A1')
+            self._header, self._row_map = list(NEW_COLUMNS), {}
+        return self._header
+
+    def find_row_number(self, nomor_do):
+        """Mencari nomor baris sheet untuk NOMOR DO, memverifikasi sel agar peta tidak basi."""
+        if self._row_map is None:
+            self.load_row_map()
+        row_number = self._row_map.get(nomor_do)
+        if row_number is None:
+            return None
+
+        do_col = self._header.index("NOMOR DO") + 1
+        if str(self.worksheet.cell(row_number, do_col).value).strip() == nomor_do:
+            return row_number
+
+        # Peta sudah basi (ada baris lain yang disisipkan/dihapus), baca ulang sekali
+        self.load_row_map()
+        return self._row_map.get(nomor_do)
+
+    def last_update_time(self):
+        """Waktu ubah terakhir spreadsheet (metadata Drive); None jika tidak bisa dibaca."""
+        try:
+            return self.worksheet.spreadsheet.get_lastUpdateTime()
+        except Exception:
+            return None
+
+    def fetch_rows(self, start_row, end_row):
+        """Membaca baris sheet start_row..end_row sebagai list dict (angka di-numericise seperti get_all_records)."""
+        if end_row < start_row:
+            return []
+        from gspread.utils import numericise_all, rowcol_to_a1
+        end_cell = rowcol_to_a1(end_row, len(self._header))
+        rows = []
+        for values in self.worksheet.get(f"A{start_row}:{end_cell}"):
+            values = list(values) + [""] * (len(self._header) - len(values))
+            rows.append(dict(zip(self._header, numericise_all(values))))
+        return rows
+
+    def fetch_changes(self, update_time=None):
+        """
+        Mengambil perubahan sheet sejak fetch terakhir tanpa get_all_records setiap kali:
+
+        - waktu ubah spreadsheet tidak berubah -> tidak ada data yang dibaca;
+        - kolom NOMOR DO hanya bertambah di akhir -> hanya baris baru yang dibaca;
+        - selain itu (edit di tengah, baris disisipkan, rekonsiliasi berkala) -> seluruh
+          baris dibaca, tetapi hanya baris yang sidik jarinya berubah yang dikembalikan.
+
+        Mengembalikan (list baris baru/berubah, list NOMOR DO yang hilang), atau None
+        jika tidak ada perubahan. update_time bisa diberikan jika waktu ubah spreadsheet
+        sudah dibaca pemanggil (mis. PartitionedGSheetsStorage untuk semua partisi sekaligus).
+        """
+        if update_time is None:
+            update_time = self.last_update_time()
+        if update_time is not None and update_time == self._synced_update_time:
+            return None
+
+        header, row_map = self.load_row_map()
+        if "NOMOR DO" not in header:
+            self._synced_update_time, self._synced_rows = update_time, {}
+            return [], []
+
+        keys = list(row_map)
+        known = self._synced_rows
+        removed = [k for k in known if k not in row_map] if known is not None else []
+
+        full_due = time.time() - self._last_full_fetch > self.FULL_RECONCILE_SECONDS
+        if known is not None and not full_due and len(keys) > len(known) and keys[:len(known)] == list(known):
+            # Hanya append: baca ekor sheet saja
+            first_new = row_map[keys[len(known)]]
+            changed = self.fetch_rows(first_new, row_map[keys[-1]])
+        else:
+            rows = self.fetch_rows(2, max(row_map.values(), default=1))
+            self._last_full_fetch = time.time()
+            changed = [
+                r for r in rows
+                if known is None or known.get(str(r.get("NOMOR DO", "")).strip()) != row_fingerprint(r)
+            ]
+
+        synced = dict(known or {})
+        for k in removed:
+            synced.pop(k, None)
+        for r in changed:
+            synced[str(r.get("NOMOR DO", "")).strip()] = row_fingerprint(r)
+        self._synced_rows = {k: synced[k] for k in keys if k in synced}
+        self._synced_update_time = update_time
+        return changed, removed
+
+    @property
+    def has_baseline(self):
+        """True jika isi sheet sudah pernah dibaca, jadi perubahan dari pihak lain bisa dikenali."""
+        return self._synced_rows is not None
+
+    def synced_fingerprint(self, nomor_do):
+        """Sidik jari baris NOMOR DO saat sinkron terakhir; None jika tidak diketahui."""
+        return (self._synced_rows or {}).get(nomor_do)
+
+    def synced_keys(self):
+        """Semua NOMOR DO di sheet saat sinkron terakhir."""
+        return set(self._synced_rows or ())
+
+    def note_own_write(self, data_rows=(), deleted_dos=(), update_time=None):
+        """Mencatat tulisan dari aplikasi ini agar fetch_changes berikutnya tidak membaca ulang sheet."""
+        if self._synced_rows is None:
+            return
+        for data_row in data_rows:
+            self._synced_rows[str(data_row["NOMOR DO"]).strip()] = row_fingerprint(data_row)
+        for nomor_do in deleted_dos:
+            self._synced_rows.pop(nomor_do, None)
+        self._synced_update_time = update_time if update_time is not None else self.last_update_time()
+
+    def load(self):
+        data = self.worksheet.get_all_records()
+        df = pd.DataFrame(data)
+        if df.empty or df.columns.empty:
+            return pd.DataFrame(columns=NEW_COLUMNS)
+        return df
+
+    def get(self, nomor_do):
+        nomor_do = str(nomor_do).strip()
+        row_number = self.find_row_number(nomor_do)
+        if row_number is None:
+            return None
+        values = self.worksheet.row_values(row_number)
+        return dict(zip(self._header, values))
+
+    def upsert(self, data_row):
+        from gspread.utils import rowcol_to_a1
+        header = self.ensure_header()
+        row = normalize_row(data_row)
+        values = [row.get(col, "") for col in header]
+
+        row_number = self.find_row_number(row["NOMOR DO"])
+        if row_number is not None:
+            end_cell = rowcol_to_a1(row_number, len(header))
+            self.worksheet.update([values], f"A{row_number}:{end_cell}", value_input_option='USER_ENTERED')
+        else:
+            self.worksheet.append_row(values, value_input_option='USER_ENTERED', table_range='A1')
+            # Baris baru selalu di akhir tabel; peta cukup dibaca ulang saat dibutuhkan
+            self._row_map = None
+        self.note_own_write(data_rows=[row])
+
+    def delete(self, nomor_do):
+        row_number = self.find_row_number(str(nomor_do).strip())
+        if row_number is None:
+            return False
+        self.worksheet.delete_rows(row_number)
+        self._row_map = None
+        self.note_own_write(deleted_dos=[str(nomor_do).strip()])
+        return True
+
+    def apply_batch(self, data_rows, deleted_dos):
+        """
+        Menulis sekumpulan perubahan dengan sesedikit mungkin panggilan API:
+        satu batch_update untuk baris yang sudah ada, satu batch deleteDimension untuk
+        baris yang dihapus dan satu append_rows untuk DO baru.
+        """
+        from gspread.utils import rowcol_to_a1
+        header, row_map = self.load_row_map()
+        if not header:
+            header = self.ensure_header()
+        rows = [normalize_row(r) for r in data_rows]
+
+        updates, appends = [], []
+        for row in rows:
+            values = [row.get(col, "") for col in header]
+            row_number = row_map.get(row["NOMOR DO"])
+            if row_number is not None:
+                end_cell = rowcol_to_a1(row_number, len(header))
+                updates.append({"range": f"A{row_number}:{end_cell}", "values": [values]})
+            else:
+                appends.append(values)
+        if updates:
+            self.worksheet.batch_update(updates, value_input_option='USER_ENTERED')
+
+        delete_numbers = sorted((row_map[k] for k in set(deleted_dos) if k in row_map), reverse=True)
+        if delete_numbers:
+            # Dari bawah ke atas agar nomor baris yang belum dihapus tidak bergeser
+            self.worksheet.spreadsheet.batch_update({"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": self.worksheet.id, "dimension": "ROWS",
+                    "startIndex": n - 1, "endIndex": n,
+                }}}
+                for n in delete_numbers
+            ]})
+        if appends:
+            self.worksheet.append_rows(appends, value_input_option='USER_ENTERED', table_range='A1')
+
+        self._row_map = None
+        self.note_own_write(data_rows=rows, deleted_dos=deleted_dos)
+
+    def rewrite_all(self, df):
+        """MODE PERBAIKAN: menulis ulang seluruh sheet dari DataFrame."""
+        rows = [normalize_row(r) for r in df.to_dict("records")]
+        data = [list(NEW_COLUMNS)] + [[row[col] for col in NEW_COLUMNS] for row in rows]
+
+        # Tulis dulu, baru bersihkan sisa baris lama: sheet tidak pernah kosong di tengah proses
+        self.worksheet.update(data, 'A1', value_input_option='USER_ENTERED')
+        if self.worksheet.row_count > len(data):
+            self.worksheet.batch_clear([f"A{len(data) + 1}:{self.worksheet.row_count}"])
+        self._header, self._row_map = None, None
+        self._synced_update_time, self._synced_rows = None, None
+
+
+def partition_year(data_row):
+    """Tahun partisi satu baris DO dari kolom 'Date' (mis. '2025'); '' jika tanggal kosong/tidak valid."""
+    date = normalize_date(data_row.get("Date"))
+    return date[:4] if len(date) == len("YYYY-MM-DD") and date[:4].isdigit() else ""
+
+
+class PartitionedGSheetsStorage(DOStorage):
+    """
+    Mirror Google Sheets yang dipecah per tahun 'Date' DO: worksheet '<nama>_<tahun>'
+    (mis. 'DO_2025') di spreadsheet yang sama dengan worksheet dasar '<nama>'. Worksheet dasar
+    menampung DO tanpa tanggal dan data lama sebelum dipecah; DO lama pindah ke partisinya saat
+    diedit, atau sekaligus lewat rewrite_all.
+
+    Setiap partisi adalah GSheetsStorage dengan baseline sinkronnya sendiri. Partisi tahun yang
+    sudah tutup hanya dibaca saat belum punya baseline dan saat rekonsiliasi berkala, jadi
+    riwayat bertahun-tahun tidak diunduh ulang setiap kali spreadsheet berubah.
+    Beberapa partisi dibaca/ditulis paralel (FETCH_WORKERS thread).
+    """
+
+    FETCH_WORKERS = 4
+    # Partisi tahun X dianggap tutup setelah 1 Januari X+1 lewat sekian hari (DO akhir tahun masih diedit)
+    CLOSED_AFTER_DAYS = 31
+    FULL_RECONCILE_SECONDS = GSheetsStorage.FULL_RECONCILE_SECONDS
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.spreadsheet = worksheet.spreadsheet
+        self.base_title = worksheet.title
+        # Tahun -> GSheetsStorage; '' = worksheet dasar
+        self._partitions = {"": GSheetsStorage(worksheet)}
+        # NOMOR DO -> tahun partisi tempat DO berada di sheet (dari fetch/tulis terakhir)
+        self._locations = {}
+        self._listed = False
+        self._synced_update_time = None
+        self._last_full_fetch = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=self.FETCH_WORKERS, thread_name_prefix="gsheets-partition")
+
+    # --- Router ---
+
+    def partition_title(self, year):
+        return f"{self.base_title}_{year}" if year else self.base_title
+
+    def list_partitions(self):
+        """Membaca daftar worksheet partisi di spreadsheet (satu panggilan API); mengembalikan tahun-tahunnya."""
+        prefix = f"{self.base_title}_"
+        for worksheet in self.spreadsheet.worksheets():
+            year = worksheet.title[len(prefix):]
+            if worksheet.title.startswith(prefix) and len(year) == 4 and year.isdigit() and year not in self._partitions:
+                self._partitions[year] = GSheetsStorage(instrumentation.instrument_worksheet(worksheet))
+        self._listed = True
+        return sorted(y for y in self._partitions if y)
+
+    def partition(self, year, create=False):
+        """GSheetsStorage untuk partisi tahun year ('' = worksheet dasar); dibuat jika create=True dan belum ada."""
+        if not self._listed:
+            self.list_partitions()
+        part = self._partitions.get(year)
+        if part is None and create:
+            had_baseline = self.has_baseline
+            title = self.partition_title(year)
+            try:
+                worksheet = self.spreadsheet.add_worksheet(title, rows=1000, cols=len(NEW_COLUMNS))
+            except Exception:
+                # Sudah dibuat instance lain sejak daftar partisi terakhir dibaca
+                worksheet = self.spreadsheet.worksheet(title)
+            part = self._partitions[year] = GSheetsStorage(instrumentation.instrument_worksheet(worksheet))
+            if had_baseline:
+                # Baseline partisi baru, agar tulisan pertama tercatat sebagai tulisan sendiri
+                part.fetch_changes()
+        return part
+
+    def closed_before_year(self):
+        """Partisi dengan tahun di bawah nilai ini sudah tutup."""
+        return str((datetime.now() - timedelta(days=self.CLOSED_AFTER_DAYS)).year)
+
+    def partitions_for_range(self, date_from=None, date_to=None):
+        """Tahun partisi yang beririsan dengan rentang tanggal (worksheet dasar tidak termasuk)."""
+        first = normalize_date(date_from)[:4] if date_from is not None else ""
+        last = normalize_date(date_to)[:4] if date_to is not None else "9999"
+        if not self._listed:
+            self.list_partitions()
+        return {y for y in self._partitions if y and first <= y <= last}
+
+    def locate(self, nomor_dos):
+        """Tahun partisi untuk setiap NOMOR DO (None jika tidak ada); tanpa baseline kolom NOMOR DO setiap partisi dibaca."""
+        missing = [k for k in nomor_dos if k not in self._locations]
+        if missing and not self.has_baseline:
+            years = list(self._partitions)
+            row_maps = self._pool.map(lambda y: self._partitions[y].load_row_map()[1], years)
+            for year, row_map in zip(years, row_maps):
+                for nomor_do in missing:
+                    if nomor_do in row_map:
+                        self._locations[nomor_do] = year
+        return {k: self._locations.get(k) for k in nomor_dos}
+
+    # --- Sinkronisasi ---
+
+    def last_update_time(self):
+        return self._partitions[""].last_update_time()
+
+    def fetch_changes(self, update_time=None):
+        """
+        Seperti GSheetsStorage.fetch_changes untuk semua partisi: waktu ubah spreadsheet dibaca sekali,
+        lalu worksheet dasar, partisi terbuka dan partisi tutup yang belum punya baseline (semua partisi
+        saat rekonsiliasi berkala) dibaca paralel.
+        """
+        if update_time is None:
+            update_time = self.last_update_time()
+        if update_time is not None and update_time == self._synced_update_time:
+            return None
+
+        self.list_partitions()
+        full_due = time.time() - self._last_full_fetch > self.FULL_RECONCILE_SECONDS
+        closed_before = self.closed_before_year()
+        years = [
+            y for y, part in self._partitions.items()
+            if full_due or not part.has_baseline or not y or y >= closed_before
+        ]
+        results = list(zip(years, self._pool.map(lambda y: self._partitions[y].fetch_changes(update_time), years)))
+
+        changed = []
+        for year, changes in results:
+            if changes is not None:
+                for r in changes[0]:
+                    self._locations[str(r.get("NOMOR DO", "")).strip()] = year
+                changed.extend(changes[0])
+        # DO yang hilang dari satu partisi tetapi muncul di partisi lain (tanggal diubah) tidak dihapus
+        removed = set()
+        for year, changes in results:
+            if changes is not None:
+                removed.update(k for k in changes[1] if self._locations.get(k) == year)
+        for nomor_do in removed:
+            self._locations.pop(nomor_do, None)
+
+        if full_due:
+            self._last_full_fetch = time.time()
+        self._synced_update_time = update_time
+        return changed, sorted(removed)
+
+    @property
+    def has_baseline(self):
+        return self._listed and all(part.has_baseline for part in self._partitions.values())
+
+    def synced_fingerprint(self, nomor_do):
+        part = self._partitions.get(self._locations.get(nomor_do))
+        return part.synced_fingerprint(nomor_do) if part is not None else None
+
+    def synced_keys(self):
+        return set().union(*(part.synced_keys() for part in self._partitions.values()))
+
+    # --- Baca / Tulis ---
+
+    def load(self, years=None):
+        """Data semua partisi (atau hanya tahun-tahun di years + worksheet dasar), dibaca paralel."""
+        if not self._listed:
+            self.list_partitions()
+        selected = [y for y in self._partitions if years is None or not y or y in years]
+        frames = [df for df in self._pool.map(lambda y: self._partitions[y].load(), selected) if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=NEW_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def query(self, date_from=None, date_to=None, transportir=None, jenis_bbm=None):
+        """Hanya partisi yang beririsan dengan rentang tanggal (plus worksheet dasar) yang dibaca."""
+        df = self.load(self.partitions_for_range(date_from, date_to))
+        return filter_frame(df, date_from, date_to, transportir, jenis_bbm)
+
+    def get(self, nomor_do):
+        nomor_do = str(nomor_do).strip()
+        year = self.locate([nomor_do])[nomor_do]
+        return None if year is None else self._partitions[year].get(nomor_do)
+
+    def upsert(self, data_row):
+        self.apply_batch([data_row], [])
+
+    def delete(self, nomor_do):
+        nomor_do = str(nomor_do).strip()
+        if self.locate([nomor_do])[nomor_do] is None:
+            return False
+        self.apply_batch([], [nomor_do])
+        return True
+
+    def apply_batch(self, data_rows, deleted_dos):
+        """
+        Router tulis: setiap DO ditulis ke partisi tahun 'Date'-nya (dibuat jika belum ada), lalu
+        GSheetsStorage.apply_batch dijalankan paralel per partisi. DO yang tahunnya berubah (atau
+        masih di worksheet dasar) sekaligus dihapus dari partisi lamanya.
+        """
+        rows = [normalize_row(r) for r in data_rows]
+        locations = self.locate([r["NOMOR DO"] for r in rows] + list(deleted_dos))
+        batches = {}
+        for row in rows:
+            year = partition_year(row)
+            batches.setdefault(year, ([], []))[0].append(row)
+            old_year = locations[row["NOMOR DO"]]
+            if old_year is not None and old_year != year:
+                batches.setdefault(old_year, ([], []))[1].append(row["NOMOR DO"])
+        for nomor_do in deleted_dos:
+            if locations[nomor_do] is not None:
+                batches.setdefault(locations[nomor_do], ([], []))[1].append(nomor_do)
+        if not batches:
+            return
+
+        had_baseline = self.has_baseline
+        for year, (upserts, _) in batches.items():
+            if upserts:
+                self.partition(year, create=True)
+        list(self._pool.map(lambda y: self._partitions[y].apply_batch(*batches[y]), list(batches)))
+
+        for year, (upserts, deletes) in batches.items():
+            for nomor_do in deletes:
+                if self._locations.get(nomor_do) == year:
+                    self._locations.pop(nomor_do)
+            for row in upserts:
+                self._locations[row["NOMOR DO"]] = year
+        if had_baseline:
+            # Satu-satunya perubahan adalah tulisan ini: partisi lain tidak perlu dibaca ulang
+            update_time = self.last_update_time()
+            for part in self._partitions.values():
+                part.note_own_write(update_time=update_time)
+            self._synced_update_time = update_time
+
+    def rewrite_all(self, df):
+        """MODE PERBAIKAN: menulis ulang semua partisi dari DataFrame (DO lama di worksheet dasar ikut dipindah)."""
+        by_year = {}
+        for row in df.to_dict("records"):
+            by_year.setdefault(partition_year(normalize_row(row)), []).append(row)
+        self.list_partitions()
+        for year in by_year:
+            self.partition(year, create=True)
+        list(self._pool.map(
+            lambda y: self._partitions[y].rewrite_all(pd.DataFrame(by_year.get(y, []), columns=NEW_COLUMNS)),
+            list(self._partitions)
+        ))
+        self._locations = {}
+        self._synced_update_time = None
+        self._last_full_fetch = 0.0
+
+
+# --- SQLite + Mirror Google Sheets ---
+
+class MirroredStorage(DOStorage):
+    """
+    Membaca dan menulis ke SQLite lokal, lalu menyalin setiap perubahan ke Google Sheets
+    di background thread sehingga halaman tidak menunggu round trip jaringan.
+
+    Perubahan yang belum terkirim disimpan di outbox SQLite (transaksi yang sama dengan
+    datanya), dikirim per batch dan dicoba ulang dengan backoff saat Google Sheets lambat /
+    offline. queue_sync=True tetap mengisi outbox walau mirror belum tersambung
+    (attach_mirror menyusul), jadi simpan saat offline tidak hilang.
+    Jika journal diberikan (lihat local_journal.LocalJournal), setiap perubahan juga dicatat
+    sebagai salinan lokal append-only.
+    """
+
+    RETRY_DELAY_SECONDS = 5
+    MAX_RETRY_DELAY_SECONDS = 5 * 60
+    PULL_INTERVAL_SECONDS = 60
+    # Lease pengirim outbox; diperbarui setiap putaran worker (<= PULL_INTERVAL_SECONDS)
+    SYNC_LEASE_SECONDS = 2 * 60
+    # Jumlah maksimum perubahan yang dikirim dalam satu batch ke Google Sheets
+    MAX_BATCH_SIZE = 200
+
+    def __init__(self, local, mirror=None, journal=None, queue_sync=None):
+        self.local = local
+        self.mirror = None
+        self.journal = journal
+        self.queue_sync = mirror is not None if queue_sync is None else queue_sync
+        self.last_error = None
+        # Waktu (epoch) percobaan kirim berikutnya selama backoff; None jika tidak sedang gagal
+        self.retry_at = None
+        # DO yang perubahan lokalnya ditolak karena sudah diubah di sheet (instance lain)
+        self.conflicts = deque(maxlen=50)
+        self._wakeup = threading.Event()
+        self._failures = 0
+        self._owner = f"{os.getpid()}-{id(self)}"
+        if mirror is not None:
+            self.attach_mirror(mirror)
+        elif journal is not None and local.count() == 0 and not journal.is_empty():
+            # Tanpa Google Sheets: pulihkan database lokal dari salinan journal
+            local.replace_all(journal.load())
+        if journal is not None and journal.is_empty() and local.count() > 0:
+            self._record("record_reset", local.load().to_dict("records"))
+
+    def attach_mirror(self, mirror):
+        """
+        Menyambungkan Google Sheets (juga setelah start offline) dan menyalakan sync worker.
+        Mirror baru dipasang setelah seed berhasil: jika seed gagal, storage tetap offline dan
+        get_storage() mencoba menyambung lagi nanti.
+        """
+        if self.local.count() == 0:
+            self.seed_from_mirror(mirror)
+        self.mirror = mirror
+        self.queue_sync = True
+        threading.Thread(target=self._sync_worker, name="gsheets-sync", daemon=True).start()
+
+    @property
+    def last_sync(self):
+        """Waktu (epoch) terakhir outbox berhasil dikirim ke Google Sheets, disimpan di SQLite."""
+        return self.local.get_meta("last_sync")
+
+    def _record(self, method, items):
+        """Mencatat perubahan ke journal lokal; kegagalan journal tidak membatalkan penyimpanan."""
+        if self.journal is None or not items:
+            return
+        try:
+            getattr(self.journal, method)(items)
+        except Exception as e:
+            self.last_error = f"Journal lokal: {type(e).__name__}: {e}"
+
+    def seed_from_mirror(self, mirror=None):
+        """Mengisi SQLite dari Google Sheets (dipakai saat database lokal masih kosong)."""
+        changes = (mirror or self.mirror).fetch_changes()
+        rows = changes[0] if changes else []
+        self.local.replace_all(pd.DataFrame(rows, columns=NEW_COLUMNS))
+        self._record("record_reset", rows)
+
+    @instrumentation.timed("sync.pull")
+    def pull_from_mirror(self):
+        """
+        Menarik perubahan dari Google Sheets (edit langsung di sheet / instance lain) ke SQLite.
+
+        Jika DO yang masih punya perubahan lokal di antrian juga berubah di sheet sejak sinkron
+        terakhir, perubahan lokal itu basi: dibuang dari antrian, versi sheet dipakai, dan
+        DO dicatat di self.conflicts. Tanpa baseline (fetch pertama) perubahan lokal dipertahankan,
+        dan DO lokal yang tidak ada lagi di sheet (dihapus selama aplikasi mati) ikut dihapus.
+        Mengembalikan jumlah baris yang diubah/dihapus.
+        """
+        had_baseline = self.mirror.has_baseline
+        changes = self.mirror.fetch_changes()
+        if changes is None:
+            return 0
+        rows, removed = changes
+        pending = {}
+        for _, action, payload in self.local.outbox_peek():
+            key = payload if action == "delete" else payload["NOMOR DO"]
+            pending[key] = payload if action == "upsert" else None
+
+        stale = set()
+        if had_baseline:
+            for r in rows:
+                key = str(r.get("NOMOR DO", "")).strip()
+                if key in pending:
+                    local_row = pending[key]
+                    if local_row is None or row_fingerprint(local_row) != row_fingerprint(r):
+                        self.conflicts.append((time.time(), key, "diubah di Google Sheets"))
+                    stale.add(key)
+            for key in removed:
+                if key in pending:
+                    if pending[key] is not None:
+                        self.conflicts.append((time.time(), key, "dihapus di Google Sheets"))
+                    stale.add(key)
+        elif self.mirror.has_baseline:
+            # fetch_changes hanya membandingkan dengan baseline sebelumnya; pada fetch pertama
+            # setelah restart, NOMOR DO lokal dicocokkan dengan seluruh isi sheet
+            sheet_keys = self.mirror.synced_keys()
+            if sheet_keys:
+                # Sheet kosong/tanpa header tidak dianggap sebagai "semua DO dihapus"
+                removed = list(removed) + sorted(self.local.keys() - sheet_keys - set(removed))
+        if stale:
+            self.local.outbox_drop_keys(stale)
+
+        keep_local = pending.keys() - stale
+        rows = [r for r in rows if str(r.get("NOMOR DO", "")).strip() not in keep_local]
+        removed = [k for k in removed if k not in keep_local]
+        if rows:
+            self.local.upsert_many(rows)
+            self._record("record_upserts", rows)
+        removed = [nomor_do for nomor_do in removed if self.local.delete(nomor_do)]
+        self._record("record_deletes", removed)
+        return len(rows) + len(removed)
+
+    def load(self):
+        return self.local.load()
+
+    def data_version(self):
+        return self.local.data_version()
+
+    def get(self, nomor_do):
+        return self.local.get(nomor_do)
+
+    def query(self, date_from=None, date_to=None, transportir=None, jenis_bbm=None):
+        return self.local.query(date_from, date_to, transportir, jenis_bbm)
+
+    def monthly_aggregates(self):
+        return self.local.monthly_aggregates()
+
+    def peek_do_number(self, day=None):
+        return self.local.peek_do_number(day)
+
+    def reserve_do_number(self, day=None):
+        return self.local.reserve_do_number(day)
+
+    def reserve_do_numbers(self, count, day=None):
+        return self.local.reserve_do_numbers(count, day)
+
+    def max_row_number(self):
+        return self.local.max_row_number()
+
+    def revision(self, nomor_do):
+        return self.local.revision(nomor_do)
+
+    def upsert(self, data_row, expected_rev=None):
+        row = normalize_row(data_row)
+        new_rev = self.local.upsert(row, expected_rev, queue_sync=self.queue_sync)
+        self._record("record_upserts", [row])
+        self._wakeup.set()
+        return new_rev
+
+    def upsert_many(self, data_rows):
+        """Menyimpan banyak DO sekaligus (satu transaksi SQLite, satu batch di outbox)."""
+        rows = [normalize_row(r) for r in data_rows]
+        self.local.upsert_many(rows, queue_sync=self.queue_sync)
+        self._record("record_upserts", rows)
+        self._wakeup.set()
+
+    def delete(self, nomor_do):
+        deleted = self.local.delete(nomor_do, queue_sync=self.queue_sync)
+        if deleted:
+            self._record("record_deletes", [str(nomor_do).strip()])
+            self._wakeup.set()
+        return deleted
+
+    def pending_count(self):
+        return self.local.outbox_count()
+
+    @instrumentation.timed("sync.flush")
+    def flush_pending(self):
+        """
+        Mengirim operasi terdepan di outbox ke Google Sheets sebagai satu batch.
+        Perubahan sheet dari pihak lain ditarik dulu (cek revisi sheet lewat waktu ubah
+        spreadsheet) sehingga tulisan lokal yang basi ditolak, bukan menimpa.
+        Beberapa perubahan untuk DO yang sama digabung; yang terakhir menang.
+        Mengembalikan jumlah operasi yang terkirim.
+        """
+        self.pull_from_mirror()
+        ops = self.local.outbox_peek(self.MAX_BATCH_SIZE)
+        if not ops:
+            return 0
+        latest = {}
+        for _, action, payload in ops:
+            key = payload if action == "delete" else payload["NOMOR DO"]
+            latest.pop(key, None)
+            latest[key] = (action, payload)
+        upserts = [payload for action, payload in latest.values() if action == "upsert"]
+        deletes = [key for key, (action, _) in latest.items() if action == "delete"]
+        self.mirror.apply_batch(upserts, deletes)
+        # Hapus berdasarkan id: operasi yang masuk selama pengiriman tetap di outbox
+        self.local.outbox_remove([op_id for op_id, _, _ in ops])
+        self.local.set_meta("last_sync", time.time())
+        return len(ops)
+
+    def retry_delay(self):
+        """Backoff eksponensial setelah gagal kirim: 5 detik, 10, 20, ... maksimal 5 menit."""
+        return min(self.RETRY_DELAY_SECONDS * 2 ** max(self._failures - 1, 0), self.MAX_RETRY_DELAY_SECONDS)
+
+    def _sync_worker(self):
+        while True:
+            self._wakeup.wait(timeout=self.PULL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            try:
+                if not self.local.acquire_sync_lease(self._owner, self.SYNC_LEASE_SECONDS):
+                    # Proses lain (mis. CLI) sedang mengirim outbox yang sama
+                    continue
+                if self.local.outbox_count():
+                    while self.flush_pending():
+                        pass
+                else:
+                    # Outbox kosong: tarik perubahan dari sheet secara inkremental
+                    self.pull_from_mirror()
+                self._failures = 0
+                self.last_error = None
+            except Exception as e:
+                # Operasi tetap di outbox dan dicoba lagi setelah backoff
+                self._failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                delay = self.retry_delay()
+                self.retry_at = time.time() + delay
+                time.sleep(delay)
+                self.retry_at = None
+                self._wakeup.set()
+
+
+_OPEN_STORAGES = {}
+_OPEN_LOCK = threading.Lock()
+
+def open_mirror(worksheet, partitioned=False):
+    """Mirror Google Sheets untuk worksheet: satu worksheet, atau dipecah per tahun jika partitioned."""
+    if worksheet is None:
+        return None
+    return PartitionedGSheetsStorage(worksheet) if partitioned else GSheetsStorage(worksheet)
+
+def open_storage(db_path, worksheet=None, journal=None, queue_sync=None, partitioned=False):
+    """
+    Membuka (sekali per proses) storage SQLite di db_path dengan mirror ke worksheet
+    (partitioned=True: worksheet per tahun, lihat PartitionedGSheetsStorage)
+    dan (opsional) journal salinan lokal.
+    Semua halaman yang memanggil dengan db_path sama memakai instance dan sync thread yang sama.
+    Storage yang dibuka tanpa worksheet (offline) disambungkan saat worksheet tersedia.
+    """
+    with _OPEN_LOCK:
+        storage = _OPEN_STORAGES.get(db_path)
+        if storage is None:
+            storage = MirroredStorage(SQLiteStorage(db_path), open_mirror(worksheet, partitioned), journal, queue_sync)
+            _OPEN_STORAGES[db_path] = storage
+        elif storage.mirror is None and worksheet is not None:
+            storage.attach_mirror(open_mirror(worksheet, partitioned))
+        return storage
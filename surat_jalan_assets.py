@@ -0,0 +1,28 @@
+"""
+Lokasi aset Surat Jalan (header/logo, konfigurasi identitas) dan nama file PDF.
+
+Dipisah dari pdf_surat_jalan agar halaman bisa memakainya tanpa memuat ReportLab;
+ReportLab baru dimuat saat PDF pertama dibuat.
+"""
+import os
+
+ASSETS_FOLDER = "assets"
+CONFIG_PATH = "config_identitas.json"
+
+HEADER_IMAGE_PATHS = [
+    os.path.join(ASSETS_FOLDER, "sha.jpg"), 
+    os.path.join(ASSETS_FOLDER, "header_sha.jpg"), 
+    os.path.join(ASSETS_FOLDER, "header_sha.png"),
+]
+
+
+def find_header_image():
+    for path in HEADER_IMAGE_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+def safe_pdf_filename(nomor_do):
+    """Membuat nama file PDF yang aman dari NOMOR DO."""
+    safe_name = "".join(c for c in str(nomor_do) if c.isalnum() or c in ('-', '_')).rstrip()
+    return f"{safe_name}.pdf"
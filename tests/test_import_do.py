@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+import import_do
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def input_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(import_do, "SECRETS_PATHS", [os.path.join(".streamlit", "secrets.toml")])
+    with open("pesanan.csv", "w", encoding="utf-8") as f:
+        f.write('NOMOR DO,Client,Qty\n,PT A,8.000\n,PT B,"5.000,5"\n')
+    return "pesanan.csv"
+
+
+def import_outbox_count(db_name, *args):
+    assert import_do.main(["pesanan.csv", "--db", db_name, "--journal-dir", f"{db_name}_journal", *args]) == 0
+    return SQLiteStorage(db_name).outbox_count()
+
+
+def test_import_without_gsheets_config_does_not_queue(input_csv):
+    assert import_outbox_count("tanpa_sheets.sqlite") == 0
+    assert import_outbox_count("paksa_sync.sqlite", "--sync") == 2
+
+
+def test_import_with_gsheets_config_queues(input_csv):
+    os.makedirs(".streamlit")
+    with open(os.path.join(".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write('[gsheets_connection]\nspreadsheet = "https://docs.google.com/spreadsheets/d/x"\nworksheet = "DO"\n')
+    assert import_outbox_count("dengan_sheets.sqlite") == 2
+    assert import_outbox_count("no_sync.sqlite", "--no-sync") == 0
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+import pdf_cache
+from benchmarks.synthetic import generate_rows
+from data_access import coerce_dataset
+from storage import NEW_COLUMNS
+
+
+@pytest.fixture
+def nat_row():
+    """Baris DO dari dataset ter-coerce dengan Tgl PO kosong (NaT), seperti Download Ulang PDF."""
+    row = next(generate_rows(1))
+    row["Tgl PO"] = ""
+    return coerce_dataset(pd.DataFrame([row], columns=NEW_COLUMNS)).iloc[0].to_dict()
+
+
+def test_pdf_cache_key_with_nat(nat_row):
+    assert pd.isna(nat_row["Tgl PO"])
+    assert pdf_cache.pdf_cache_key(nat_row) == pdf_cache.pdf_cache_key(dict(nat_row, **{"Tgl PO": ""}))
+
+
+def test_render_pdf_with_nat(nat_row, tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "PDF_CACHE_DIR", str(tmp_path))
+    pdf_bytes = pdf_cache.render_pdf(nat_row)
+    assert pdf_bytes.startswith(b"%PDF")
+    # Cetak ulang berikutnya diambil dari cache
+    assert pdf_cache.cached_pdf(nat_row) == pdf_bytes
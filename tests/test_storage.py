@@ -0,0 +1,72 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from benchmarks.fake_worksheet import FakeWorksheet
+from benchmarks.synthetic import generate_rows
+from data_access import coerce_dataset
+from export import export_path
+from storage import NEW_COLUMNS, GSheetsStorage, SQLiteStorage, format_cell_value, normalize_row
+
+
+def coerced_rows_with_blank_dates():
+    rows = list(generate_rows(3))
+    rows[0]["Tgl PO"] = ""
+    rows[1]["Date"] = ""
+    return coerce_dataset(pd.DataFrame(rows, columns=NEW_COLUMNS))
+
+
+def test_format_cell_value_nat_is_empty():
+    assert format_cell_value(pd.NaT) == ""
+    assert format_cell_value(pd.Timestamp("2025-10-18")) == "2025-10-18"
+
+
+def test_normalize_row_with_nat_dates():
+    df = coerced_rows_with_blank_dates()
+    assert df["Tgl PO"].isna().iloc[0] and df["Date"].isna().iloc[1]
+    rows = [normalize_row(r) for r in df.to_dict("records")]
+    assert rows[0]["Tgl PO"] == ""
+    assert rows[1]["Date"] == ""
+
+
+def test_rewrite_all_with_blank_date():
+    df = coerced_rows_with_blank_dates()
+    worksheet = FakeWorksheet.from_records([], NEW_COLUMNS)
+    GSheetsStorage(worksheet).rewrite_all(df)
+
+    assert worksheet.rows[0] == NEW_COLUMNS
+    assert len(worksheet.rows) == len(df) + 1
+    assert worksheet.rows[1][NEW_COLUMNS.index("Tgl PO")] == ""
+    assert worksheet.rows[2][NEW_COLUMNS.index("Date")] == ""
+
+
+def test_data_version_differs_for_recreated_database(tmp_path):
+    path = str(tmp_path / "dbase.sqlite")
+    old_version = SQLiteStorage(path).data_version()
+    os.remove(path)
+    new_version = SQLiteStorage(path).data_version()
+    assert old_version.endswith(":0") and new_version.endswith(":0")
+    assert old_version != new_version
+    assert export_path(old_version, "xlsx") != export_path(new_version, "xlsx")
+
+
+def test_replace_all_is_atomic(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / "dbase.sqlite"))
+    storage.upsert_many(list(generate_rows(5)))
+    version = storage.data_version()
+
+    def fail(conn):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(storage, "bump_version", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        storage.replace_all(pd.DataFrame(list(generate_rows(2, seed=1))))
+    assert storage.count() == 5
+    assert storage.data_version() == version
+
+    monkeypatch.undo()
+    storage.replace_all(pd.DataFrame(list(generate_rows(2, seed=1))))
+    assert storage.count() == 2
+    assert storage.data_version().endswith(":2")